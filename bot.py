@@ -16,28 +16,252 @@ FEATURES:
 
 import os
 import re
-import json
+import atexit
+import functools
+import queue
+import random
+import html
+import importlib.util
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import time
 import asyncio
-import requests
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import httpx
+import orjson
+from array import array
+from collections import deque, OrderedDict, Counter
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ChatPermissions, InputMediaPhoto, WebAppInfo, BotCommand
 from telegram.ext import (
-    Application, CommandHandler, MessageHandler, CallbackQueryHandler, 
+    Application, CommandHandler, MessageHandler, CallbackQueryHandler, ChatMemberHandler, TypeHandler,
     ContextTypes, ConversationHandler, filters
 )
-from telegram.constants import ParseMode, ChatMemberStatus, ChatType
+from telegram.constants import ParseMode, ChatAction, ChatMemberStatus, ChatType
 from telegram.error import TelegramError, Conflict
-from dotenv import load_dotenv
+from telegram.request import HTTPXRequest
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+def _init_runtime():
+    """Load .env and configure logging; only done when running the bot, not on import"""
+    from dotenv import load_dotenv  # only needed here, once
+    load_dotenv()
+    
+    # Log records are only enqueued on the event loop; a listener thread does the
+    # formatting and the blocking write to stderr
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    log_sink = logging.StreamHandler()
+    log_sink.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    log_listener = QueueListener(log_queue, log_sink, respect_handler_level=True)
+    log_handler = QueueHandler(log_queue)
+    log_handler.setFormatter(logging.Formatter('%(message)s'))  # QueueHandler.prepare merges args/exc_info into msg
+    logging.basicConfig(level=logging.INFO, handlers=[log_handler])
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
+# HTTP/2 for Bot API and backend calls needs the optional h2 package (python-telegram-bot[http2])
+HAS_HTTP2 = importlib.util.find_spec('h2') is not None
+# libuv-based event loop, used when installed (not available on Windows)
+HAS_UVLOOP = importlib.util.find_spec('uvloop') is not None
+# Optional Redis mirror of logged-in sessions (REDIS_URL), so logins survive restarts
+HAS_REDIS = importlib.util.find_spec('redis') is not None
+
+# Precompiled patterns used on every message / input
+URL_RE = re.compile(r'(https?://|www\.|t\.me/|@\w+)', re.IGNORECASE)
+EMAIL_RE = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+USERNAME_RE = re.compile(r'^\w+$')
+
+# Plain text (not a /command), shared by every conversation step and handle_message
+_TEXT_NOT_CMD = filters.TEXT & ~filters.COMMAND
+
+# Only the update types we have handlers for; Telegram doesn't send (and we don't parse) the rest.
+# Edited messages still go through moderation, chat_member keeps the admin cache fresh
+ALLOWED_UPDATES = [Update.MESSAGE, Update.EDITED_MESSAGE, Update.CALLBACK_QUERY, Update.CHAT_MEMBER]
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+# Leaderboard rank markers for the top 10
+_MEDALS = ('🥇', '🥈', '🥉') + ('🏅',) * 7
+
+# Keywords that map a mention to a knowledge_base entry, in tie-break order
+_KEYWORDS_MAP = (
+    ('withdraw', ('withdraw', 'payout', 'cash out', 'payment', 'get money', 'get paid')),
+    ('faucet', ('faucet', 'free', 'claim')),
+    ('referral', ('referral', 'refer', 'invite', 'friend', 'commission')),
+    ('task', ('task', 'job', 'work', 'complete')),
+    ('survey', ('survey', 'offerwall', 'offer')),
+    ('payment', ('paypal', 'usdt', 'crypto', 'litecoin', 'skrill')),
+    ('help', ('help', 'support', 'problem', 'issue', 'contact')),
+    ('earn', ('earn', 'money', 'make money', 'how to', 'start')),
+    ('minimum', ('minimum', 'min', 'requirement', 'need', 'qualifying')),
+    ('balance', ('balance', 'check', 'how much')),
+    ('login', ('login', 'sign in', 'log in', 'access')),
+    ('register', ('register', 'sign up', 'create account', 'join')),
 )
-logger = logging.getLogger(__name__)
+
+# Inverted index for intelligent_response: keyword -> categories. The lookahead
+# pattern yields the longest keyword starting at each position; _KW_PREFIXES
+# adds the shorter keywords that match there too.
+_KW_TO_CATS: Dict[str, Tuple[str, ...]] = {}
+for _cat, _keywords in _KEYWORDS_MAP:
+    for _kw in _keywords:
+        _KW_TO_CATS[_kw] = _KW_TO_CATS.get(_kw, ()) + (_cat,)
+del _cat, _keywords, _kw
+_KW_CAT_RANK = {cat: i for i, (cat, _) in enumerate(_KEYWORDS_MAP)}
+_KW_PREFIXES = {kw: tuple(k for k in _KW_TO_CATS if kw.startswith(k)) for kw in _KW_TO_CATS}
+_KW_RE = re.compile('(?=(' + '|'.join(
+    re.escape(k) for k in sorted(_KW_TO_CATS, key=len, reverse=True)
+) + '))')
+
+class RateLimiter:
+    """Async token bucket allowing `rate` acquisitions per `per` seconds"""
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is free right now (and nobody is queued for it)"""
+        if self._lock.locked():
+            return False
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def idle_since(self) -> float:
+        """Monotonic time of the last acquisition"""
+        return self._updated
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class UserSession:
+    """A Telegram user's logged-in backend session"""
+    __slots__ = ('token', 'username', 'user_id', 'email', 'logged_in_at')
+
+    def __init__(self, token: str, username: str = None, user_id: int = None, email: str = None):
+        self.token = token
+        self.username = username
+        self.user_id = user_id
+        self.email = email
+        self.logged_in_at = time.monotonic()
+
+
+class SessionStore:
+    """UserSessions by Telegram id, capped at maxsize (oldest login evicted first) and expired after ttl seconds"""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._sessions: OrderedDict = OrderedDict()  # oldest login first
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, telegram_id: int) -> Optional[UserSession]:
+        session = self._sessions.get(telegram_id)
+        if session is not None and time.monotonic() - session.logged_in_at >= self.ttl:
+            del self._sessions[telegram_id]
+            return None
+        return session
+
+    def save(self, telegram_id: int, session: UserSession):
+        self._sessions.pop(telegram_id, None)
+        self._sessions[telegram_id] = session
+        while len(self._sessions) > self.maxsize:
+            self._sessions.popitem(last=False)
+
+    def pop(self, telegram_id: int) -> Optional[UserSession]:
+        return self._sessions.pop(telegram_id, None)
+
+    def drop_token(self, token: str) -> list:
+        """Forget every session using this API token; returns the affected Telegram ids"""
+        dropped = [tid for tid, s in self._sessions.items() if s.token == token]
+        for telegram_id in dropped:
+            del self._sessions[telegram_id]
+        return dropped
+
+    def evict_expired(self):
+        # Sessions are kept oldest first, so stop at the first one still valid
+        now = time.monotonic()
+        while self._sessions:
+            telegram_id, session = next(iter(self._sessions.items()))
+            if now - session.logged_in_at < self.ttl:
+                break
+            del self._sessions[telegram_id]
+
+
+@functools.lru_cache(maxsize=4096)
+def _auth_headers(token: str) -> Dict[str, str]:
+    """Backend auth header for a session token, built once per token (treat as read-only)"""
+    return {'Authorization': f'Token {token}'}
+
+
+def backoff_delays(base: float = 1.0, cap: float = 60.0):
+    """Endless decorrelated-jitter backoff delays: each is uniform(base, 3 * previous), capped.
+
+    Uses os.urandom-seeded randomness so restarting replicas don't retry in lockstep.
+    """
+    rng = random.SystemRandom()
+    delay = base
+    while True:
+        delay = min(cap, rng.uniform(base, delay * 3))
+        yield delay
+
+
+def require_login(prompt: str = "🔐 Please /login first!"):
+    """Decorator for EarnQuestBot handlers that need a logged-in user.
+
+    Without a session the user gets `prompt` (HTML, {website} filled in); otherwise the
+    handler is called with the user's API token as an extra argument.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+            token = self.get_user_token(update.effective_user.id)
+            if not token:
+                await self._reply(update.effective_message, prompt.format(website=self.website_url),
+                                  parse_mode=ParseMode.HTML)
+                return
+            return await handler(self, update, context, token)
+        return wrapper
+    return decorator
+
+
+class OrjsonRequest(HTTPXRequest):
+    """PTB's httpx transport, parsing Bot API responses (every update) with orjson"""
+
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> Dict[str, Any]:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            # Invalid UTF-8 / JSON: let PTB decode leniently or raise its TelegramError
+            return HTTPXRequest.parse_json_payload(payload)
+
 
 # Conversation states
 (AWAITING_EMAIL, AWAITING_PASSWORD, AWAITING_REG_USERNAME, AWAITING_REG_EMAIL, 
@@ -49,21 +273,75 @@ class EarnQuestBot:
         self.token = os.environ.get('TELEGRAM_BOT_TOKEN')
         self.api_base_url = os.environ.get('API_BASE_URL', 'https://rebackend-ij74.onrender.com/api')
         self.bot_api_key = os.environ.get('BOT_API_KEY', '')  # Key for bot to auth with backend
+        self._http: Optional[httpx.AsyncClient] = None  # Created lazily once the event loop runs
+        # Webhook mode needs the public base URL Telegram should call; on Render it is provided.
+        # Used whenever such a URL is known (USE_WEBHOOK=0 forces polling), so local runs still poll
+        self.public_url = os.environ.get('PUBLIC_URL') or os.environ.get('RENDER_EXTERNAL_URL', '')
+        self.use_webhook = bool(self.public_url) and os.environ.get('USE_WEBHOOK', '1') != '0'
+        self.port = int(os.environ.get('PORT', '8443'))
+        # Built once by setup_handlers(); conflict retries reuse it
+        self.application: Optional[Application] = None
         self.website_url = "https://earnquestapp.com"
         self.support_email = "support@earnquestapp.com"
         
         # Group settings
         self.managed_groups = set()  # Groups where bot is moderator
+        self.bot_username: Optional[str] = None  # Resolved once in post_init
+        self.bot_mention: Optional[str] = None
         
-        # User sessions
-        self.user_sessions: Dict[int, Dict] = {}
-        
-        # Support conversations
-        self.support_conversations: Dict[int, Dict] = {}
+        # Logged-in users' backend sessions
+        self.user_sessions = SessionStore(
+            maxsize=int(os.environ.get('SESSION_CACHE_MAX', '10000')),
+            ttl=int(os.environ.get('SESSION_TTL_S', str(24 * 3600))),
+        )
+        self.conversation_timeout = 600  # seconds before an abandoned login/register/support flow is dropped
+        self.redis_url = os.environ.get('REDIS_URL', '')
+        self._redis = None  # connected in restore_sessions() when REDIS_URL is set
+        self._redis_writes: set = set()  # pending write-through tasks
+        
+        # Event reporting buffer (flushed to the backend in batches)
+        self._event_queue: deque = deque()  # orjson-encoded event payloads
+        self.max_event_buffer = 1000
+        self.event_batch_size = 100
+        self.dropped_events = 0
+        self._flush_task: Optional[asyncio.Task] = None  # early flush started by report_to_backend
+        self._batch_supported = True  # cleared once the backend 404s the batch endpoint
+        self._flush_failed = False  # last flush had to requeue; no early flushes until one succeeds
         
         # Spam tracking
-        self.message_counts: Dict[int, list] = {}  # user_id -> list of timestamps
+        # Two one-minute windows of message counters: a count-min sketch of two rows, each
+        # indexed by an independent hash of (chat_id, user_id). Fixed memory regardless of how
+        # many users are active; a user is only over-counted if they collide in both rows.
+        self.spam_slots = 1 << 16  # per row
+        self._spam_curr = array('I', bytes(8 * self.spam_slots))
+        self._spam_prev = array('I', bytes(8 * self.spam_slots))
+        self._spam_epoch = int(time.monotonic() // 60)
         self.warned_users: Dict[int, int] = {}  # user_id -> warning count
+        self.warned_at: Dict[int, float] = {}  # user_id -> monotonic time of last warning
+        self.warning_ttl = 3600  # seconds without a new warning before the count resets
+        
+        # (endpoint, token) -> (response, monotonic fetch time); stale entries back up failed fetches.
+        # Least recently used first, capped at response_cache_max entries
+        self._response_cache: OrderedDict = OrderedDict()
+        self.response_cache_max = 10_000
+        self.stale_cache_ttl = 600  # seconds a cached response may still be served on errors
+        self._inflight: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}  # in-flight GETs by (endpoint, token)
+        
+        # (chat_id, user_id) -> (member status, monotonic expiry)
+        self._admin_cache: Dict[Tuple[int, int], Tuple[str, float]] = {}
+        self.admin_cache_ttl = 60  # seconds
+        
+        # Scheduled post polling: wait until the backend's next due post, within these bounds
+        self.post_poll_default = 60  # seconds, when the backend gives no hint
+        self.post_poll_min = 5
+        self.post_poll_max = 300
+        self.settings_sync_interval = 60  # seconds between moderation settings syncs
+        self._settings_due = 0.0  # monotonic time the next settings sync is due
+        self._send_semaphore = asyncio.Semaphore(25)  # Concurrent post sends, under Telegram's 30/s
+        
+        # Telegram flood limits: ~30 messages/s overall and ~1 message/s per chat
+        self._global_limiter = RateLimiter(30, 1)
+        self._chat_limiters: Dict[Any, RateLimiter] = {}  # created per chat by _chat_limiter
         
         # Moderation settings (fetched from backend)
         self.mod_settings = {
@@ -94,58 +372,414 @@ class EarnQuestBot:
             'register': "📝 To register:\n\n• Use /register in private chat\n• Or visit: {website}/register",
             'start': "🚀 **Getting Started:**\n\n1. /register or /login\n2. /offerwalls to earn\n3. /tasks for quick tasks\n4. /referral to invite friends\n5. /balance to check earnings",
         }
+        # Website and email are fixed, so render the answers once
+        self.knowledge_base = {
+            k: v.format(website=self.website_url, email=self.support_email)
+            for k, v in self.knowledge_base.items()
+        }
+        self.render_mod_texts()
+        
+        # All knowledge-base keywords in one pattern; the lookahead reports a match
+        # at every position so overlapping keywords are all found in a single pass
+        self._kb_rank = {keyword: i for i, keyword in enumerate(self.knowledge_base)}
+        self._kb_re = re.compile('(?=(' + '|'.join(
+            re.escape(k) for k in sorted(self.knowledge_base, key=len, reverse=True)
+        ) + '))')
+        
+        # callback_data is "<prefix>_<rest>"; button_handler dispatches on the prefix
+        self._cb_dispatch = {
+            "start": self._handle_start_cb,
+            "cmd": self._handle_cmd_cb,
+            "support": self._handle_support_cb,
+            "faq": self._handle_faq_cb,
+        }
+        # cmd_<name> -> command handler
+        self._cb_table = {
+            "balance": self.balance_command,
+            "stats": self.stats_command,
+            "referral": self.referral_command,
+            "leaderboard": self.leaderboard_command,
+            "offerwalls": self.offerwalls_command,
+            "tasks": self.tasks_command,
+            "surveys": self.surveys_command,
+            "faq": self.faq_command,
+        }
+        # Fixed replies that only depend on the configured URLs (Markdown / Markdown / HTML)
+        self._group_start_text = (
+            "🤖 **EarnQuest Bot**\n\n"
+            "I'm here to help and keep this group clean!\n\n"
+            f"🌐 Start earning: {self.website_url}\n"
+            "💬 DM me for account features"
+        )
+        self._group_help_text = (
+            "🤖 Hi! I can help with:\n\n"
+            "• /balance - Check your balance\n"
+            "• /referral - Get referral link\n"
+            "• /support - Get help\n\n"
+            "Or ask me about: withdrawals, tasks, surveys, referrals, faucet\n\n"
+            f"🌐 Full features at: {self.website_url}"
+        )
+        self._support_received_text = (
+            "✅ <b>Message Received!</b>\n\n"
+            "Our team will review your message.\n\n"
+            f"📧 You can also email: {self.support_email}\n"
+            f"🌐 Or visit: {self.website_url}/support"
+        )
+        # Empty-listing replies for /tasks and /offerwalls (HTML)
+        self._no_tasks_text = (
+            "📭 <b>No Tasks Available</b>\n\n"
+            "Check back later for new earning opportunities!\n\n"
+            "🎯 Try offerwalls instead: /offerwalls\n"
+            f"🌐 {self.website_url}/tasks"
+        )
+        self._no_offerwalls_text = (
+            "📭 <b>No Offerwalls Available</b>\n\n"
+            f"Check back later or visit: {self.website_url}/offerwalls"
+        )
+        # Private-chat /start menu (Web App button opens the offerwalls in Telegram)
+        self._start_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔐 Login", callback_data="start_login"),
+             InlineKeyboardButton("📝 Register", callback_data="start_register")],
+            [InlineKeyboardButton("💰 Balance", callback_data="cmd_balance"),
+             InlineKeyboardButton("📊 Stats", callback_data="cmd_stats")],
+            # Open offerwalls directly in Telegram as Web App
+            [InlineKeyboardButton(
+                "🎯 Open Offerwalls", 
+                web_app=WebAppInfo(url=f"{self.website_url}/offerwalls")
+            )],
+            [InlineKeyboardButton("🎯 List Offerwalls", callback_data="cmd_offerwalls")],
+            [InlineKeyboardButton("📊 Surveys", callback_data="cmd_surveys"),
+             InlineKeyboardButton("📝 Tasks", callback_data="cmd_tasks")],
+            [InlineKeyboardButton("👥 Referral", callback_data="cmd_referral"),
+             InlineKeyboardButton("🏆 Leaderboard", callback_data="cmd_leaderboard")],
+            [InlineKeyboardButton("🆘 Support", callback_data="cmd_support"),
+             InlineKeyboardButton("❓ FAQ", callback_data="cmd_faq")],
+            [InlineKeyboardButton("🌐 Visit Website", url=self.website_url)],
+        ])
+        # Fixed keyboards under the /tasks listing and group welcome messages
+        self._tasks_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 View All Tasks", url=f"{self.website_url}/tasks")],
+            [InlineKeyboardButton("🎯 Offerwalls", callback_data="cmd_offerwalls"),
+             InlineKeyboardButton("💰 Balance", callback_data="cmd_balance")],
+        ])
+        self._welcome_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🌐 Start Earning", url=self.website_url)]])
+        # /register: the whole sign-up form in one Web App screen, or the step-by-step chat flow
+        # (start_register enters register_conv only when chosen, so the Web App path leaves no flow waiting)
+        self._register_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Register in one step", web_app=WebAppInfo(url=f"{self.website_url}/register"))],
+            [InlineKeyboardButton("💬 Register here in chat", callback_data="start_register")],
+        ])
+        # /<name> -> command handler (login/register/support/cancel belong to the conversations)
+        self._cmd_table = {name: getattr(self, attr) for name, attr, _ in self._COMMANDS if attr}
         
         logger.info(f"🔧 API: {self.api_base_url}")
         logger.info(f"✅ Bot token: {'Loaded' if self.token else 'MISSING!'}")
+        if os.environ.get('USE_WEBHOOK', '0') != '0' and not self.public_url:
+            logger.warning("⚠️ USE_WEBHOOK is set but PUBLIC_URL is missing - falling back to polling")
 
     # ==================== API HELPERS ====================
     
-    def api_request(self, method: str, endpoint: str, token: str = None, data: dict = None, timeout: int = 15) -> tuple:
-        """Make API request"""
-        headers = {'Content-Type': 'application/json'}
-        if token:
-            headers['Authorization'] = f'Token {token}'
-        if self.bot_api_key:
-            headers['X-Bot-Key'] = self.bot_api_key
-            
-        url = f"{self.api_base_url}/{endpoint.lstrip('/')}"
+    async def _ensure_session(self) -> httpx.AsyncClient:
+        """Get the shared backend HTTP client, creating it on first use"""
+        if self._http is None or self._http.is_closed:
+            headers = {
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+                'User-Agent': 'EarnQuestBot/1.0',
+            }
+            if self.bot_api_key:
+                headers['X-Bot-Key'] = self.bot_api_key
+            # One pooled transport: TCP/TLS connections to the backend are reused
+            # across calls, and failed connection attempts are retried. With h2
+            # installed, concurrent calls are multiplexed over a single connection.
+            # The pool is sized for command bursts (leaderboard, stats) from many users
+            transport = httpx.AsyncHTTPTransport(
+                http2=HAS_HTTP2,
+                retries=2,
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=75),
+            )
+            # Endpoints are passed as paths relative to the API root
+            self._http = httpx.AsyncClient(
+                base_url=self.api_base_url,
+                headers=headers,
+                # Reads allow for backend cold starts; everything else fails fast,
+                # including waiting for a free pooled connection
+                timeout=httpx.Timeout(15, connect=5, write=5, pool=5),
+                transport=transport,
+            )
+        return self._http
+
+    async def close_session(self):
+        """Close the shared backend HTTP client"""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+
+    async def close(self):
+        """Send any queued events, then release the backend connections"""
+        await self._flush_events()
+        await self.close_session()
+        if self._redis is not None:
+            if self._redis_writes:
+                await asyncio.wait(self._redis_writes)
+            await self._redis.aclose()
+            self._redis = None
+
+    async def api_request(self, method: str, endpoint: str, token: str = None, data: dict = None,
+                          timeout: Optional[float] = None, content: bytes = None) -> tuple:
+        """Make API request; `content` sends an already-encoded JSON body instead of `data`.
+        `timeout` overrides only the client's read timeout"""
+        method = method.upper()
+        if method not in ('GET', 'POST', 'PATCH', 'DELETE'):
+            return None, "Invalid method"
+        
+        # Slow-changing GETs are served from the response cache while fresh
+        ttl = self.CACHE_TTLS.get(endpoint) if method == 'GET' else None
+        key = (endpoint, None if endpoint in self.SHARED_CACHE_ENDPOINTS else token)
+        cached = self._response_cache.get(key) if ttl else None
+        if cached:
+            age = time.monotonic() - cached[1]
+            if age < ttl:
+                self._response_cache.move_to_end(key)
+                return cached[0], None
+            if age >= self.stale_cache_ttl:
+                cached = None
+        
+        if content is None and data is not None:
+            content = orjson.dumps(data)
+        if method != 'GET':
+            return await self._send_request(method, endpoint, token, content, timeout, ttl, cached, key)
+        
+        # Single-flight: concurrent identical GETs share one backend request
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._send_request(method, endpoint, token, content, timeout, ttl, cached, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller being cancelled doesn't cancel the others
+        return await asyncio.shield(task)
+
+    async def _send_request(self, method: str, endpoint: str, token: Optional[str], content: Optional[bytes],
+                            timeout: Optional[float], ttl: Optional[int], cached: Optional[tuple],
+                            key: Tuple[str, Optional[str]]) -> tuple:
+        """Perform one backend request for api_request, updating the response cache"""
+        headers = _auth_headers(token) if token else None
+
+        # Idempotent GETs with no stale copy to fall back on ride out brief backend
+        # hiccups (cold starts, deploys); auth/client errors are never retried
+        retries = self.GET_RETRIES if method == 'GET' and not cached else 0
+        delays = backoff_delays(base=0.2, cap=2.0)
+        while True:
+            try:
+                client = await self._ensure_session()
+                response = await self._fetch(client, method, endpoint, content, headers, timeout)
+            except httpx.HTTPError as e:  # anything else is a bug and goes to the error handler
+                if retries and isinstance(e, self.RETRY_ERRORS):
+                    retries -= 1
+                    await asyncio.sleep(next(delays))
+                    continue
+                if cached:
+                    logger.warning("⚠️ API Error on %s, serving cached response: %s", endpoint, e)
+                    return cached[0], None
+                logger.error("API Error: %s", e)
+                return None, str(e)
+            if retries and response.status_code in self.RETRY_STATUSES:
+                retries -= 1
+                await asyncio.sleep(next(delays))
+                continue
+            break
         
+        if token and response.status_code == 401:
+            # Token revoked or expired on the backend - make the user log in again
+            for telegram_id in self.user_sessions.drop_token(token):
+                self.mirror_session(telegram_id, None)
+            self.invalidate_cache(token)
+        elif ttl:
+            if response.status_code == 200:
+                self._response_cache[key] = (response, time.monotonic())
+                self._response_cache.move_to_end(key)
+                if len(self._response_cache) > self.response_cache_max:
+                    self._response_cache.popitem(last=False)
+            elif response.status_code >= 500 and cached:
+                logger.warning("⚠️ Backend returned %s for %s, serving cached response", response.status_code, endpoint)
+                return cached[0], None
+        return response, None
+
+    async def _fetch(self, client: httpx.AsyncClient, method: str, endpoint: str, content: Optional[bytes],
+                     headers: Optional[dict], timeout: Optional[float]) -> httpx.Response:
+        """Send one request and read its body; error bodies over MAX_ERROR_BODY are dropped instead"""
+        # A per-request timeout replaces the client's whole Timeout, so keep its connect/write/pool limits
+        timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else httpx.Timeout(timeout, connect=5, write=5, pool=5)
+        request = client.build_request(method, endpoint.lstrip('/'), content=content, headers=headers, timeout=timeout)
+        response = await client.send(request, stream=True)
         try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=headers, timeout=timeout)
-            elif method.upper() == 'POST':
-                response = requests.post(url, json=data, headers=headers, timeout=timeout)
-            elif method.upper() == 'PATCH':
-                response = requests.patch(url, json=data, headers=headers, timeout=timeout)
-            else:
-                return None, "Invalid method"
-            return response, None
-        except Exception as e:
-            logger.error(f"API Error: {e}")
-            return None, str(e)
+            if response.status_code < 400:
+                await response.aread()
+                return response
+            # Error pages (e.g. a proxy's HTML) are only used for messages; never buffer a huge one
+            chunks, size = [], int(response.headers.get('Content-Length') or 0)
+            if size <= self.MAX_ERROR_BODY:
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > self.MAX_ERROR_BODY:
+                        break
+                    chunks.append(chunk)
+            if size > self.MAX_ERROR_BODY:
+                logger.warning("⚠️ %s %s returned %d with a %d+ byte body, dropped", method, endpoint, response.status_code, size)
+                chunks = []
+            return httpx.Response(response.status_code, content=b''.join(chunks), request=request)
+        finally:
+            await response.aclose()
+
+    # First page of tasks plus totals; backends without summary support return the full list
+    TASKS_SUMMARY_ENDPOINT = '/tasks/?limit=5&summary=1'
+    # Per-service offerwall/survey iframe URL
+    IFRAME_ENDPOINT = '/services/{}/iframe/'
+
+    # Extra attempts for a failed GET, and the gateway statuses / transport errors worth retrying
+    GET_RETRIES = 2
+    RETRY_STATUSES = frozenset({502, 503, 504})
+    # Failures where the request never reached the backend; read timeouts go straight to
+    # the cached/error path instead of holding the user for another full read
+    RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    # Largest error response body kept (bytes)
+    MAX_ERROR_BODY = 64 * 1024
+
+    # Seconds a successful GET response stays fresh, per endpoint
+    CACHE_TTLS = {
+        '/leaderboard/top-earners/': 60,
+        '/keys/': 60,
+        TASKS_SUMMARY_ENDPOINT: 20,
+        '/my-referral-info/': 30,
+        '/dashboard/stats/': 15,
+        '/profile/': 5,
+    }
+    # Same for every user, so cached once rather than per token
+    SHARED_CACHE_ENDPOINTS = frozenset({'/leaderboard/top-earners/'})
+
+    def invalidate_cache(self, token: str):
+        """Drop every cached response fetched with `token` (e.g. after it changed the user's data)"""
+        for key in [key for key in self._response_cache if key[1] == token]:
+            del self._response_cache[key]
+
+    async def restore_sessions(self):
+        """Connect to Redis (if configured) and reload the sessions saved there"""
+        if not self.redis_url:
+            return
+        if not HAS_REDIS:
+            logger.warning("⚠️ REDIS_URL is set but the redis package is not installed - sessions stay in memory")
+            return
+        
+        import redis.asyncio as aioredis
+        from redis.exceptions import RedisError
+        self._redis = aioredis.Redis.from_url(self.redis_url, max_connections=50)
+        try:
+            keys = [key async for key in self._redis.scan_iter(match='sess:*', count=500)]
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.get(key)
+                    pipe.pttl(key)
+                results = await pipe.execute() if keys else []
+        except RedisError as e:
+            logger.error("Failed to restore sessions from Redis: %s", e)
+            return
+        
+        restored, bad_keys = [], []
+        for key, raw, pttl in zip(keys, results[::2], results[1::2]):
+            if raw is None or pttl <= 0:
+                continue
+            try:
+                data = orjson.loads(raw)
+                session = UserSession(data['token'], data.get('username'), data.get('user_id'), data.get('email'))
+                telegram_id = int(key.split(b':', 1)[1])
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                # Malformed or legacy entry: drop it rather than fail startup
+                bad_keys.append(key)
+                continue
+            # Backdate so the in-memory TTL ends when the Redis key expires
+            session.logged_in_at -= self.user_sessions.ttl - pttl / 1000
+            restored.append((session.logged_in_at, telegram_id, session))
+        if bad_keys:
+            logger.warning("⚠️ Skipping %d unreadable sessions in Redis", len(bad_keys))
+            try:
+                await self._redis.delete(*bad_keys)
+            except RedisError as e:
+                logger.warning("⚠️ Could not delete unreadable sessions: %s", e)
+        for _, telegram_id, session in sorted(restored, key=lambda item: item[0]):
+            self.user_sessions.save(telegram_id, session)
+        logger.info("🔑 Restored %d sessions from Redis", len(restored))
+
+    def mirror_session(self, telegram_id: int, session: Optional[UserSession]):
+        """Write a saved (or, with None, removed) session through to Redis in the background"""
+        if self._redis is None:
+            return
+        key = f'sess:{telegram_id}'
+        if session is None:
+            write = self._redis.delete(key)
+        else:
+            write = self._redis.set(key, orjson.dumps({
+                'token': session.token, 'username': session.username,
+                'user_id': session.user_id, 'email': session.email,
+            }), ex=int(self.user_sessions.ttl))
+        task = asyncio.ensure_future(write)
+        self._redis_writes.add(task)
+        task.add_done_callback(self._redis_write_done)
+
+    def _redis_write_done(self, task: asyncio.Task):
+        self._redis_writes.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.warning("⚠️ Redis session write failed: %s", task.exception())
 
     def get_user_token(self, telegram_id: int) -> Optional[str]:
         """Get user's API token if logged in"""
         session = self.user_sessions.get(telegram_id)
-        return session.get('token') if session else None
+        return session.token if session else None
+
+    def render_mod_texts(self):
+        """Pre-render welcome/rules texts; called whenever mod_settings change"""
+        welcome = self.mod_settings.get('welcome_message') or '👋 Welcome!'
+        rules = self.mod_settings.get('rules_message') or '📜 Be respectful!'
+        self._welcome_rendered = welcome.replace('{website}', self.website_url)
+        self._rules_rendered = rules.replace('{website}', self.website_url)
 
     # ==================== BACKEND SYNC ====================
     
-    async def fetch_scheduled_posts(self, context: ContextTypes.DEFAULT_TYPE):
-        """Fetch and execute scheduled posts from backend"""
+    async def fetch_scheduled_posts(self, context: ContextTypes.DEFAULT_TYPE) -> Optional[float]:
+        """Fetch and execute scheduled posts from backend.
+
+        Returns seconds until the next scheduled post if the backend reports it
+        (``{"posts": [...], "next_scheduled_at": "<ISO 8601>"}``), else None.
+        A plain list response is still accepted.
+        """
         try:
-            response, error = self.api_request('GET', '/bot/scheduled-posts/')
+            response, error = await self.api_request('GET', '/bot/scheduled-posts/')
             
             if error or not response or response.status_code != 200:
-                return
+                return None
             
-            posts = response.json()
+            data = orjson.loads(response.content)
+            if isinstance(data, dict):
+                posts = data.get('posts', [])
+                next_scheduled_at = data.get('next_scheduled_at')
+            else:
+                posts, next_scheduled_at = data, None
+            
+            # Posts are independent; the send semaphore and rate limiters bound the fan-out
+            await asyncio.gather(
+                *(self.execute_scheduled_post(context, post) for post in posts),
+                return_exceptions=True
+            )
             
-            for post in posts:
-                await self.execute_scheduled_post(context, post)
+            if next_scheduled_at:
+                next_at = datetime.fromisoformat(next_scheduled_at)
+                if next_at.tzinfo is None:
+                    next_at = next_at.replace(tzinfo=timezone.utc)
+                return (next_at - datetime.now(timezone.utc)).total_seconds()
                 
         except Exception as e:
-            logger.error(f"Error fetching scheduled posts: {e}")
+            logger.error("Error fetching scheduled posts: %s", e)
+        return None
 
     async def execute_scheduled_post(self, context: ContextTypes.DEFAULT_TYPE, post: dict):
         """Execute a scheduled post"""
@@ -159,108 +793,219 @@ class EarnQuestBot:
             # Format content with website URL
             content = content.replace('{website}', self.website_url)
             
-            for group_id in target_groups:
-                try:
-                    if image_url:
-                        await context.bot.send_photo(
-                            chat_id=group_id,
-                            photo=image_url,
-                            caption=content,
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    else:
-                        await context.bot.send_message(
-                            chat_id=group_id,
-                            text=content,
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    
+            # Send to all groups concurrently, bounded by the send semaphore
+            results = await asyncio.gather(
+                *(self._send_one(context, group_id, content, image_url) for group_id in target_groups),
+                return_exceptions=True
+            )
+            
+            for group_id, result in zip(target_groups, results):
+                if isinstance(result, Exception):
+                    logger.error("Failed to post to %s: %s", group_id, result)
+                    # Log failed post
+                    self.report_to_backend(
+                        event_type='error',
+                        data={'post_id': post_id, 'error': str(result), 'target_group': group_id},
+                        description=f"Failed to send scheduled post #{post_id} to {group_id}: {result}"
+                    )
+                else:
                     # Log successful post
-                    await self.report_to_backend(
+                    self.report_to_backend(
                         event_type='post_sent',
                         data={'post_id': post_id, 'post_type': post_type, 'has_image': bool(image_url)},
                         chat_id=int(group_id) if str(group_id).lstrip('-').isdigit() else None,
                         description=f"Scheduled post #{post_id} ({post_type}) sent successfully"
                     )
-                except Exception as e:
-                    logger.error(f"Failed to post to {group_id}: {e}")
-                    # Log failed post
-                    await self.report_to_backend(
-                        event_type='error',
-                        data={'post_id': post_id, 'error': str(e), 'target_group': group_id},
-                        description=f"Failed to send scheduled post #{post_id} to {group_id}: {e}"
-                    )
             
             # Mark post as executed
-            self.api_request('POST', f'/bot/scheduled-posts/{post_id}/mark-executed/')
+            await self.api_request('POST', f'/bot/scheduled-posts/{post_id}/mark-executed/')
             
         except Exception as e:
-            logger.error(f"Error executing post: {e}")
+            logger.error("Error executing post: %s", e)
+
+    async def _send_one(self, context: ContextTypes.DEFAULT_TYPE, group_id, content: str, image_url: Optional[str]):
+        """Send one scheduled post to one group"""
+        async with self._send_semaphore:
+            if image_url:
+                await self._rl_send(
+                    group_id, 'send_photo',
+                    photo=image_url,
+                    caption=content,
+                    parse_mode=ParseMode.MARKDOWN
+                )
+            else:
+                await self._rl_send(
+                    group_id, 'send_message',
+                    text=content,
+                    parse_mode=ParseMode.MARKDOWN
+                )
+
+    def _chat_limiter(self, chat_id) -> RateLimiter:
+        """Per-chat token bucket: ~20 msgs/min in groups, short bursts of ~1/s in private chats"""
+        limiter = self._chat_limiters.get(chat_id)
+        if limiter is None:
+            is_group = str(chat_id).startswith(('-', '@'))
+            limiter = self._chat_limiters[chat_id] = RateLimiter(18, 60) if is_group else RateLimiter(3, 3)
+        return limiter
+
+    async def _rl_send(self, chat_id, method: str, **kwargs):
+        """Call a Bot send method for chat_id behind the per-chat and global rate limits"""
+        async with self._chat_limiter(chat_id), self._global_limiter:
+            return await getattr(self.application.bot, method)(chat_id=chat_id, **kwargs)
+
+    async def _rl_notice(self, chat_id, method: str, **kwargs):
+        """Like _rl_send for best-effort group notices, but dropped (None) when the chat's budget
+        is spent, so a raid can't park every moderation handler on the limiter"""
+        if not self._chat_limiter(chat_id).try_acquire():
+            logger.debug("Chat %s is over its send budget, dropping %s", chat_id, method)
+            return None
+        async with self._global_limiter:
+            return await getattr(self.application.bot, method)(chat_id=chat_id, **kwargs)
+
+    async def _reply(self, message, text: str, **kwargs):
+        """Send text to message's chat through the rate limiters"""
+        return await self._rl_send(message.chat_id, 'send_message', text=text, **kwargs)
+
+    async def _edit(self, message, text: str, **kwargs):
+        """Edit one of our messages through the rate limiters"""
+        return await self._rl_send(message.chat_id, 'edit_message_text', message_id=message.message_id, text=text, **kwargs)
+
+    LOADING_DELAY = 0.25  # seconds a backend call may take before a loading placeholder is shown
+
+    async def _placeholder(self, message, task: asyncio.Future, text: str):
+        """Send a loading placeholder only if task is still running after LOADING_DELAY"""
+        done, _ = await asyncio.wait({task}, timeout=self.LOADING_DELAY)
+        return None if done else await self._reply(message, text)
+
+    async def _with_typing(self, message, request) -> tuple:
+        """Await a backend call, showing "typing…" in the chat meanwhile if it takes longer than LOADING_DELAY"""
+        task = asyncio.ensure_future(request)
+        done, _ = await asyncio.wait({task}, timeout=self.LOADING_DELAY)
+        if not done:
+            try:
+                await message.reply_chat_action(ChatAction.TYPING)  # overlaps the backend call still in flight
+            except TelegramError:
+                pass
+        return await task
+
+    async def _respond(self, message, status_msg, text: str, **kwargs):
+        """Edit the loading placeholder if one was sent, else reply directly"""
+        if status_msg is None:
+            return await self._reply(message, text, **kwargs)
+        return await self._edit(status_msg, text, **kwargs)
+
+    async def _authed_get(self, message, endpoint: str, token: str, error_text: str) -> Optional[dict]:
+        """GET `endpoint` as the user (typing shown meanwhile); replies `error_text` and returns None on failure"""
+        response, error = await self._with_typing(message, self.api_request('GET', endpoint, token=token))
+        if error or response.status_code != 200:
+            await self._reply(message, error_text)
+            return None
+        return orjson.loads(response.content)
 
     async def fetch_mod_settings(self):
         """Fetch moderation settings from backend"""
+        self._settings_due = time.monotonic() + self.settings_sync_interval
         try:
-            # Make request with bot API key header
-            headers = {'Content-Type': 'application/json'}
-            if self.bot_api_key:
-                headers['X-Bot-Key'] = self.bot_api_key
-            
-            response = requests.get(
-                f"{self.api_base_url}/bot/settings/",
-                headers=headers,
-                timeout=15
-            )
+            response, error = await self.api_request('GET', '/bot/settings/')
+            if error:
+                return
             
             if response.status_code == 200:
-                settings = response.json()
-                logger.info(f"📥 Received settings from backend: {settings}")
+                settings = orjson.loads(response.content)
+                logger.debug("📥 Received settings from backend: %s", settings)
                 self.mod_settings.update(settings)
-                logger.info(f"✅ Mod settings synced: allow_links={self.mod_settings.get('allow_links')}, allow_forwards={self.mod_settings.get('allow_forwards')}")
+                self.render_mod_texts()
+                logger.debug("✅ Mod settings synced: allow_links=%s, allow_forwards=%s",
+                             self.mod_settings.get('allow_links'), self.mod_settings.get('allow_forwards'))
             elif response.status_code == 401:
-                logger.error(f"❌ Bot API key unauthorized. Check BOT_API_KEY env variable.")
+                logger.error("❌ Bot API key unauthorized. Check BOT_API_KEY env variable.")
             else:
-                logger.warning(f"⚠️ Failed to fetch settings: {response.status_code} - {response.text}")
+                logger.warning("⚠️ Failed to fetch settings: %s - %s", response.status_code, response.text)
         except Exception as e:
-            logger.error(f"Error fetching settings: {e}")
-
-    async def report_to_backend(self, event_type: str, data: dict, 
-                                  telegram_user_id: int = None, 
-                                  telegram_username: str = None,
-                                  chat_id: int = None,
-                                  description: str = None):
-        """Report events to backend for logging"""
-        try:
-            # Build payload with all required fields
-            payload = {
-                'event_type': event_type,
-                'data': data,
-            }
-            
-            if telegram_user_id:
-                payload['telegram_user_id'] = telegram_user_id
-            if telegram_username:
-                payload['telegram_username'] = telegram_username
-            if chat_id:
-                payload['chat_id'] = chat_id
-            if description:
-                payload['description'] = description
-            
-            # Make request with bot API key header
-            headers = {'Content-Type': 'application/json'}
-            if self.bot_api_key:
-                headers['X-Bot-Key'] = self.bot_api_key
+            logger.error("Error fetching settings: %s", e)
+
+    _EVENT_TEMPLATE = {'event_type': None, 'data': None}
+
+    def report_to_backend(self, event_type: str, data: dict,
+                          telegram_user_id: int = None,
+                          telegram_username: str = None,
+                          chat_id: int = None,
+                          description: str = None):
+        """Queue an event for the backend log (sent in batches by _flush_events)"""
+        # Build payload with all required fields
+        payload = self._EVENT_TEMPLATE.copy()
+        payload['event_type'] = event_type
+        payload['data'] = data
+        
+        if telegram_user_id:
+            payload['telegram_user_id'] = telegram_user_id
+        if telegram_username:
+            payload['telegram_username'] = telegram_username
+        if chat_id:
+            payload['chat_id'] = chat_id
+        if description:
+            payload['description'] = description
+        
+        # Bounded buffer - drop the oldest event rather than grow without limit
+        if len(self._event_queue) >= self.max_event_buffer:
+            self._event_queue.popleft()
+            self._count_dropped(1)
+        
+        # Encode once; batches are spliced together from the encoded events
+        self._event_queue.append(orjson.dumps(payload))
+        
+        # A full batch is waiting - send it now instead of at the next _flush_events tick.
+        # Not while the backend is failing: the periodic job retries then, at its own pace
+        if (len(self._event_queue) >= self.event_batch_size and not self._flush_failed
+                and (self._flush_task is None or self._flush_task.done())):
+            self._flush_task = asyncio.create_task(self._flush_events())
+
+    async def _flush_events(self, context: ContextTypes.DEFAULT_TYPE = None):
+        """Send queued events to the backend, up to event_batch_size per request"""
+        while self._event_queue:
+            batch = [self._event_queue.popleft()
+                     for _ in range(min(self.event_batch_size, len(self._event_queue)))]
             
-            response = requests.post(
-                f"{self.api_base_url}/bot/events/",
-                json=payload,
-                headers=headers,
-                timeout=10
-            )
+            if self._batch_supported:
+                body = b'{"events":[' + b','.join(batch) + b']}'
+                response, error = await self.api_request('POST', '/bot/events/batch/', content=body, timeout=10)
+                if response is not None and response.status_code == 404:
+                    # Backend without the batch endpoint - use one request per event from now on
+                    logger.info("Batch event endpoint not available, posting events one by one")
+                    self._batch_supported = False
+                elif error or response.status_code not in [200, 201]:
+                    if response is not None:
+                        logger.warning("Event logging failed: %s", response.status_code)
+                    self._requeue_events(batch)
+                    self._flush_failed = True
+                    return
+                else:
+                    continue
             
-            if response.status_code != 200:
-                logger.warning(f"Event logging failed: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error logging event: {e}")
+            for i, payload in enumerate(batch):
+                response, error = await self.api_request('POST', '/bot/events/', content=payload, timeout=10)
+                if error or response.status_code not in [200, 201]:
+                    if response is not None:
+                        logger.warning("Event logging failed: %s", response.status_code)
+                    self._requeue_events(batch[i:])
+                    self._flush_failed = True
+                    return
+        self._flush_failed = False
+
+    def _requeue_events(self, events: list):
+        """Put unsent events back at the front (oldest first) for the next flush, as far as the buffer allows"""
+        room = max(self.max_event_buffer - len(self._event_queue), 0)
+        kept = events[-room:] if room else []
+        self._event_queue.extendleft(reversed(kept))
+        if len(kept) < len(events):
+            self._count_dropped(len(events) - len(kept))
+
+    def _count_dropped(self, count: int):
+        """Record events lost to a full buffer, warning on the first and then every 100th"""
+        before = self.dropped_events
+        self.dropped_events += count
+        if (before - 1) // 100 != (self.dropped_events - 1) // 100:
+            logger.warning("⚠️ Event buffer full, dropped %s events so far", self.dropped_events)
 
     # ==================== MODERATION (GROUP MODE) ====================
     
@@ -274,64 +1019,65 @@ class EarnQuestBot:
         if chat.type not in [ChatType.GROUP, ChatType.SUPERGROUP]:
             return False
         
-        logger.info(f"🔍 Moderating message in chat {chat.id} from {user.username or user.first_name}")
-        logger.info(f"📋 Current mod_settings: allow_links={self.mod_settings.get('allow_links')}, allow_forwards={self.mod_settings.get('allow_forwards')}")
+        logger.debug("🔍 Moderating message in chat %s from %s", chat.id, user.username or user.first_name)
+        
+        text = message.text or message.caption or ''
+        has_link = not self.mod_settings.get('allow_links', False) and bool(URL_RE.search(text))
+        is_spam = await self.check_spam(chat.id, user.id)
+        is_forward = not self.mod_settings.get('allow_forwards', True) and message.forward_origin is not None
+        
+        # Nothing to act on - skip the admin lookup entirely
+        if not (has_link or is_spam or is_forward):
+            return False
         
         # Don't moderate admins
         try:
-            member = await context.bot.get_chat_member(chat.id, user.id)
-            if member.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]:
-                logger.info(f"⏭️ Skipping moderation for admin: {user.username}")
+            status = await self.get_member_status(context, chat.id, user.id)
+            if status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]:
+                logger.debug("⏭️ Skipping moderation for admin: %s", user.username)
                 return False
         except Exception as e:
-            logger.warning(f"Could not check member status: {e}")
-        
-        text = message.text or message.caption or ''
+            logger.warning("Could not check member status: %s", e)
         
         # Check for links (if not allowed)
-        allow_links = self.mod_settings.get('allow_links', False)
-        if not allow_links:
-            url_pattern = r'(https?://|www\.|t\.me/|@\w+)'
-            if re.search(url_pattern, text, re.IGNORECASE):
-                logger.info(f"🔗 Link detected in message from {user.username}: {text[:50]}...")
-                try:
-                    await message.delete()
-                    logger.info(f"✅ Deleted message with link from {user.username}")
-                    warning = await chat.send_message(
-                        f"⚠️ @{user.username or user.first_name}, links are not allowed!",
-                    )
-                    # Log the deletion
-                    await self.report_to_backend(
-                        event_type='message_deleted',
-                        data={'reason': 'Link detected', 'text_preview': text[:100]},
-                        telegram_user_id=user.id,
-                        telegram_username=user.username or user.first_name,
-                        chat_id=chat.id,
-                        description=f"Deleted message with link from @{user.username or user.first_name}"
-                    )
-                    # Delete warning after 10 seconds
-                    await asyncio.sleep(10)
-                    try:
-                        await warning.delete()
-                    except:
-                        pass
-                except Exception as e:
-                    logger.error(f"❌ Failed to delete message: {e}")
-                
-                await self.warn_user_internal(chat.id, user.id, context, "Posting links")
-                return True
+        if has_link:
+            logger.info("🔗 Link detected in message from %s: %s...", user.username, text[:50])
+            try:
+                await message.delete()
+                logger.info("✅ Deleted message with link from %s", user.username)
+                warning = await self._rl_notice(
+                    chat.id, 'send_message',
+                    text=f"⚠️ @{user.username or user.first_name}, links are not allowed!",
+                )
+                # Log the deletion
+                self.report_to_backend(
+                    event_type='message_deleted',
+                    data={'reason': 'Link detected', 'text_preview': text[:100]},
+                    telegram_user_id=user.id,
+                    telegram_username=user.username or user.first_name,
+                    chat_id=chat.id,
+                    description=f"Deleted message with link from @{user.username or user.first_name}"
+                )
+                # Delete warning after 10 seconds
+                self.schedule_delete(context, warning, 10)
+            except Exception as e:
+                logger.error("❌ Failed to delete message: %s", e)
+            
+            await self.warn_user_internal(chat.id, user.id, context, "Posting links")
+            return True
         
         # Check for spam (too many messages)
-        if await self.check_spam(user.id):
-            logger.info(f"🚨 Spam detected from {user.username}")
+        if is_spam:
+            logger.info("🚨 Spam detected from %s", user.username)
             try:
                 await message.delete()
                 await self.mute_user_internal(chat.id, user.id, context, 5)  # 5 min mute
-                await chat.send_message(
-                    f"🔇 @{user.username or user.first_name} muted for 5 minutes (spam)"
+                await self._rl_notice(
+                    chat.id, 'send_message',
+                    text=f"🔇 @{user.username or user.first_name} muted for 5 minutes (spam)"
                 )
                 # Log the mute
-                await self.report_to_backend(
+                self.report_to_backend(
                     event_type='user_muted',
                     data={'reason': 'Spam detected', 'duration_minutes': 5},
                     telegram_user_id=user.id,
@@ -340,18 +1086,17 @@ class EarnQuestBot:
                     description=f"Muted @{user.username or user.first_name} for 5 minutes (spam)"
                 )
             except Exception as e:
-                logger.error(f"❌ Failed to handle spam: {e}")
+                logger.error("❌ Failed to handle spam: %s", e)
             return True
         
         # Check for forwarded messages (if not allowed)
-        allow_forwards = self.mod_settings.get('allow_forwards', True)
-        if message.forward_date and not allow_forwards:
-            logger.info(f"📤 Forwarded message detected from {user.username}")
+        if is_forward:
+            logger.info("📤 Forwarded message detected from %s", user.username)
             try:
                 await message.delete()
-                logger.info(f"✅ Deleted forwarded message from {user.username}")
+                logger.info("✅ Deleted forwarded message from %s", user.username)
                 # Log the deletion
-                await self.report_to_backend(
+                self.report_to_backend(
                     event_type='message_deleted',
                     data={'reason': 'Forwarded message not allowed'},
                     telegram_user_id=user.id,
@@ -360,45 +1105,85 @@ class EarnQuestBot:
                     description=f"Deleted forwarded message from @{user.username or user.first_name}"
                 )
             except Exception as e:
-                logger.error(f"❌ Failed to delete forwarded message: {e}")
+                logger.error("❌ Failed to delete forwarded message: %s", e)
             return True
         
         return False
 
-    async def check_spam(self, user_id: int) -> bool:
-        """Check if user is spamming"""
-        now = datetime.now()
+    def schedule_delete(self, context, message, delay: int):
+        """Delete a message after `delay` seconds without holding up the handler"""
+        if message is None:  # notice was dropped by _rl_notice
+            return
+        context.job_queue.run_once(
+            self._delete_later, delay,
+            data={'chat_id': message.chat_id, 'message_id': message.message_id}
+        )
+
+    async def _delete_later(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job callback for schedule_delete"""
+        try:
+            await context.bot.delete_message(**context.job.data)
+        except TelegramError:
+            pass  # Already deleted or too old
+
+    async def get_member_status(self, context, chat_id: int, user_id: int) -> str:
+        """Get a user's chat member status, cached for admin_cache_ttl seconds"""
+        key = (chat_id, user_id)
+        now = time.monotonic()
+        cached = self._admin_cache.get(key)
+        if cached and now < cached[1]:
+            return cached[0]
+        
+        member = await context.bot.get_chat_member(chat_id, user_id)
+        self._admin_cache[key] = (member.status, now + self.admin_cache_ttl)
+        return member.status
+
+    async def handle_chat_member_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Drop the cached status when a member is promoted, demoted, banned, etc."""
+        change = update.chat_member
+        self._admin_cache.pop((change.chat.id, change.new_chat_member.user.id), None)
+
+    async def check_spam(self, chat_id: int, user_id: int) -> bool:
+        """Check if user is spamming in this chat (sliding one-minute window)"""
+        now = time.monotonic()
         max_per_minute = self.mod_settings.get('max_messages_per_minute', 5)
         
-        if user_id not in self.message_counts:
-            self.message_counts[user_id] = []
-        
-        # Clean old timestamps (older than 1 minute)
-        self.message_counts[user_id] = [
-            ts for ts in self.message_counts[user_id]
-            if (now - ts).seconds < 60
-        ]
-        
-        self.message_counts[user_id].append(now)
-        
-        return len(self.message_counts[user_id]) > max_per_minute
+        epoch = int(now // 60)
+        if epoch != self._spam_epoch:
+            # Roll the windows; after a gap of more than a minute both are stale
+            if epoch == self._spam_epoch + 1:
+                self._spam_prev = self._spam_curr
+            else:
+                self._spam_prev = array('I', bytes(8 * self.spam_slots))
+            self._spam_curr = array('I', bytes(8 * self.spam_slots))
+            self._spam_epoch = epoch
+        
+        slots = self.spam_slots
+        idx1 = hash((chat_id, user_id)) % slots
+        idx2 = slots + hash((user_id, chat_id, 0x9E3779B9)) % slots
+        curr, prev = self._spam_curr, self._spam_prev
+        curr[idx1] += 1
+        curr[idx2] += 1
+        
+        # Weight the previous minute by how much of it still overlaps the window;
+        # the smaller row estimate is the one least inflated by collisions
+        overlap = 1 - (now / 60 - epoch)
+        count = min(curr[idx1] + prev[idx1] * overlap, curr[idx2] + prev[idx2] * overlap)
+        return count > max_per_minute
 
     async def warn_user_internal(self, chat_id: int, user_id: int, context, reason: str):
         """Internal warning system"""
-        if user_id not in self.warned_users:
-            self.warned_users[user_id] = 0
-        
-        self.warned_users[user_id] += 1
-        warnings = self.warned_users[user_id]
+        warnings = self.warned_users[user_id] = self.warned_users.get(user_id, 0) + 1
+        self.warned_at[user_id] = time.monotonic()
         
         if warnings >= 3:
             await self.ban_user_internal(chat_id, user_id, context, f"3 warnings - Last: {reason}")
-            await context.bot.send_message(
-                chat_id,
-                f"🚫 User banned after 3 warnings!"
+            await self._rl_notice(
+                chat_id, 'send_message',
+                text=f"🚫 User banned after 3 warnings!"
             )
             # Log the ban
-            await self.report_to_backend(
+            self.report_to_backend(
                 event_type='user_banned',
                 data={'reason': f'3 warnings: {reason}', 'warning_count': warnings},
                 telegram_user_id=user_id,
@@ -406,10 +1191,11 @@ class EarnQuestBot:
                 description=f"User banned after 3 warnings. Last warning: {reason}"
             )
             del self.warned_users[user_id]
+            self.warned_at.pop(user_id, None)
             return  # Don't log a warning if we already logged a ban
         
         # Report warning to backend
-        await self.report_to_backend(
+        self.report_to_backend(
             event_type='user_warned',
             data={'reason': reason, 'warning_count': warnings},
             telegram_user_id=user_id,
@@ -419,7 +1205,7 @@ class EarnQuestBot:
 
     async def mute_user_internal(self, chat_id: int, user_id: int, context, minutes: int):
         """Mute a user"""
-        until = datetime.now() + timedelta(minutes=minutes)
+        until = int(time.time()) + minutes * 60  # Unix timestamp, as Telegram expects
         try:
             await context.bot.restrict_chat_member(
                 chat_id,
@@ -428,7 +1214,7 @@ class EarnQuestBot:
                 until_date=until
             )
         except Exception as e:
-            logger.error(f"Failed to mute: {e}")
+            logger.error("Failed to mute: %s", e)
 
     async def ban_user_internal(self, chat_id: int, user_id: int, context, reason: str = "Multiple warnings"):
         """Ban a user and save to database"""
@@ -437,40 +1223,33 @@ class EarnQuestBot:
             try:
                 user = await context.bot.get_chat_member(chat_id, user_id)
                 username = user.user.username or user.user.first_name
-            except:
+            except TelegramError:
                 username = str(user_id)
             
             # Ban in Telegram
             await context.bot.ban_chat_member(chat_id, user_id)
-            logger.info(f"🚫 Banned user {username} (ID: {user_id}) from chat {chat_id}")
+            logger.info("🚫 Banned user %s (ID: %s) from chat %s", username, user_id, chat_id)
             
             # Save to database via API
             try:
-                headers = {'Content-Type': 'application/json'}
-                if self.bot_api_key:
-                    headers['X-Bot-Key'] = self.bot_api_key
-                
-                response = requests.post(
-                    f"{self.api_base_url}/bot/banned-users/",
-                    json={
-                        'telegram_user_id': str(user_id),
-                        'telegram_username': username,
-                        'reason': reason,
-                        'banned_in_chat': str(chat_id)
-                    },
-                    headers=headers,
-                    timeout=15
-                )
+                response, error = await self.api_request('POST', '/bot/banned-users/', data={
+                    'telegram_user_id': str(user_id),
+                    'telegram_username': username,
+                    'reason': reason,
+                    'banned_in_chat': str(chat_id)
+                })
                 
-                if response.status_code in [200, 201]:
-                    logger.info(f"✅ Saved banned user to database: {username}")
+                if error:
+                    logger.error("Error saving banned user to DB: %s", error)
+                elif response.status_code in [200, 201]:
+                    logger.info("✅ Saved banned user to database: %s", username)
                 else:
-                    logger.warning(f"⚠️ Failed to save banned user: {response.status_code} - {response.text}")
+                    logger.warning("⚠️ Failed to save banned user: %s - %s", response.status_code, response.text)
             except Exception as e:
-                logger.error(f"Error saving banned user to DB: {e}")
+                logger.error("Error saving banned user to DB: %s", e)
                 
         except Exception as e:
-            logger.error(f"Failed to ban: {e}")
+            logger.error("Failed to ban: %s", e)
 
     # ==================== GROUP COMMANDS ====================
     
@@ -480,28 +1259,22 @@ class EarnQuestBot:
             if member.is_bot:
                 continue
             
-            welcome = self.mod_settings.get('welcome_message', '👋 Welcome!')
-            welcome = welcome.replace('{website}', self.website_url)
-            welcome = welcome.replace('{name}', member.first_name)
-            
-            keyboard = [[InlineKeyboardButton("🌐 Start Earning", url=self.website_url)]]
+            welcome = self._welcome_rendered.replace('{name}', member.first_name)
             
             try:
-                msg = await update.effective_chat.send_message(
-                    f"👋 Welcome {member.first_name}!\n\n{welcome}",
-                    reply_markup=InlineKeyboardMarkup(keyboard)
+                msg = await self._rl_notice(
+                    update.effective_chat.id, 'send_message',
+                    text=f"👋 Welcome {member.first_name}!\n\n{welcome}",
+                    reply_markup=self._welcome_markup
                 )
                 # Delete welcome after 60 seconds to keep chat clean
-                await asyncio.sleep(60)
-                await msg.delete()
-            except:
-                pass
+                self.schedule_delete(context, msg, 60)
+            except TelegramError as e:
+                logger.warning("Failed to send welcome: %s", e)
 
     async def rules_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show group rules"""
-        rules = self.mod_settings.get('rules_message', '📜 Be respectful!')
-        rules = rules.replace('{website}', self.website_url)
-        await update.message.reply_text(rules, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(self._rules_rendered, parse_mode=ParseMode.MARKDOWN)
 
     async def unban_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Unban a user (admin only). Usage: /unban @username or /unban user_id"""
@@ -516,14 +1289,14 @@ class EarnQuestBot:
         # Check if user is admin
         try:
             member = await context.bot.get_chat_member(chat.id, user.id)
-            logger.info(f"User {user.username} status in chat {chat.id}: {member.status}")
+            logger.debug("User %s status in chat %s: %s", user.username, chat.id, member.status)
             
             # Check for admin/owner/creator status
             if member.status not in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER, 'administrator', 'creator']:
                 await update.message.reply_text(f"⛔ Only admins can unban users. Your status: {member.status}")
                 return
         except Exception as e:
-            logger.error(f"Could not verify admin status: {e}")
+            logger.error("Could not verify admin status: %s", e)
             # If we can't check, allow the command but Telegram will reject if not admin
             pass
         
@@ -560,13 +1333,9 @@ class EarnQuestBot:
             # Unban in Telegram
             if target_user_id:
                 await context.bot.unban_chat_member(chat.id, target_user_id, only_if_banned=True)
-                logger.info(f"✅ Unbanned user {target_user_id} from chat {chat.id}")
+                logger.info("✅ Unbanned user %s from chat %s", target_user_id, chat.id)
             
             # Remove from database via API
-            headers = {'Content-Type': 'application/json'}
-            if self.bot_api_key:
-                headers['X-Bot-Key'] = self.bot_api_key
-            
             # Try to delete by user_id or username
             delete_data = {}
             if target_user_id:
@@ -574,14 +1343,9 @@ class EarnQuestBot:
             if target_username:
                 delete_data['telegram_username'] = target_username
             
-            response = requests.delete(
-                f"{self.api_base_url}/bot/banned-users/",
-                json=delete_data,
-                headers=headers,
-                timeout=15
-            )
+            response, error = await self.api_request('DELETE', '/bot/banned-users/', data=delete_data)
             
-            if response.status_code in [200, 204]:
+            if not error and response.status_code in [200, 204]:
                 await update.message.reply_text(
                     f"✅ User unbanned successfully!\n\n"
                     f"ID: `{target_user_id}`\n"
@@ -595,7 +1359,7 @@ class EarnQuestBot:
                 )
                 
             # Log the unban
-            await self.report_to_backend(
+            self.report_to_backend(
                 event_type='user_unbanned',
                 data={'unbanned_by': user.username or user.first_name},
                 telegram_user_id=target_user_id,
@@ -605,7 +1369,7 @@ class EarnQuestBot:
             )
                 
         except Exception as e:
-            logger.error(f"Failed to unban: {e}")
+            logger.error("Failed to unban: %s", e)
             await update.message.reply_text(f"❌ Failed to unban: {e}")
 
     async def sync_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -620,7 +1384,7 @@ class EarnQuestBot:
                 if member.status not in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]:
                     await update.message.reply_text("⛔ Only admins can sync settings.")
                     return
-            except:
+            except TelegramError:
                 pass
         
         msg = await update.message.reply_text("🔄 Syncing settings from backend...")
@@ -654,107 +1418,69 @@ class EarnQuestBot:
         bot_mentioned = False
         if message.reply_to_message and message.reply_to_message.from_user.id == context.bot.id:
             bot_mentioned = True
-        if f'@{(await context.bot.get_me()).username}'.lower() in text:
+        if self.bot_mention in text:
             bot_mentioned = True
         
         if not bot_mentioned:
             # Check for keywords and respond helpfully
-            for keyword, response in self.knowledge_base.items():
-                if keyword in text and ('?' in text or 'how' in text or 'what' in text or 'where' in text):
-                    formatted = response.format(website=self.website_url, email=self.support_email)
-                    await message.reply_text(formatted, parse_mode=ParseMode.MARKDOWN)
-                    return
+            if '?' in text or 'how' in text or 'what' in text or 'where' in text:
+                keyword = self.match_knowledge_base(text)
+                if keyword:
+                    await self._rl_notice(
+                        message.chat_id, 'send_message',
+                        text=self.knowledge_base[keyword],
+                        parse_mode=ParseMode.MARKDOWN,
+                        reply_to_message_id=message.message_id
+                    )
             return
         
         # Bot was mentioned - provide help
         await self.intelligent_response(update, context, text)
 
+    def match_knowledge_base(self, text: str) -> Optional[str]:
+        """Return the first knowledge-base keyword (in table order) found in text"""
+        found = {m.group(1) for m in self._kb_re.finditer(text)}
+        return min(found, key=self._kb_rank.__getitem__) if found else None
+
+    def _match_keywords(self, text: str) -> set:
+        """All _KEYWORDS_MAP keywords that occur in text, found in one pass"""
+        found = set()
+        for m in _KW_RE.finditer(text):
+            found.update(_KW_PREFIXES[m.group(1)])
+        return found
+
     async def intelligent_response(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
         """Generate intelligent response based on user query"""
         message = update.effective_message
         
-        # Find best matching response
-        best_match = None
-        best_score = 0
-        
-        keywords_map = {
-            'withdraw': ['withdraw', 'payout', 'cash out', 'payment', 'get money', 'get paid'],
-            'faucet': ['faucet', 'free', 'claim'],
-            'referral': ['referral', 'refer', 'invite', 'friend', 'commission'],
-            'task': ['task', 'job', 'work', 'complete'],
-            'survey': ['survey', 'offerwall', 'offer'],
-            'payment': ['paypal', 'usdt', 'crypto', 'litecoin', 'skrill'],
-            'help': ['help', 'support', 'problem', 'issue', 'contact'],
-            'earn': ['earn', 'money', 'make money', 'how to', 'start'],
-            'minimum': ['minimum', 'min', 'requirement', 'need', 'qualifying'],
-            'balance': ['balance', 'check', 'how much'],
-            'login': ['login', 'sign in', 'log in', 'access'],
-            'register': ['register', 'sign up', 'create account', 'join'],
-        }
-        
-        for key, keywords in keywords_map.items():
-            score = sum(1 for kw in keywords if kw in text)
-            if score > best_score:
-                best_score = score
-                best_match = key
-        
-        if best_match and best_match in self.knowledge_base:
-            response = self.knowledge_base[best_match]
-            formatted = response.format(website=self.website_url, email=self.support_email)
-            await message.reply_text(formatted, parse_mode=ParseMode.MARKDOWN)
+        # Count distinct matched keywords per category; ties go to the earlier category
+        scores = Counter()
+        for keyword in self._match_keywords(text):
+            scores.update(_KW_TO_CATS[keyword])
+        best_match = max(scores, key=lambda cat: (scores[cat], -_KW_CAT_RANK[cat]), default=None)
+        
+        answer = self.knowledge_base.get(best_match) if best_match else None
+        if answer:
+            await self._rl_notice(
+                message.chat_id, 'send_message',
+                text=answer,
+                parse_mode=ParseMode.MARKDOWN,
+                reply_to_message_id=message.message_id
+            )
         else:
             # Default response
-            await message.reply_text(
-                f"🤖 Hi! I can help with:\n\n"
-                f"• /balance - Check your balance\n"
-                f"• /referral - Get referral link\n"
-                f"• /support - Get help\n\n"
-                f"Or ask me about: withdrawals, tasks, surveys, referrals, faucet\n\n"
-                f"🌐 Full features at: {self.website_url}",
+            await self._rl_notice(
+                message.chat_id, 'send_message',
+                reply_to_message_id=message.message_id,
+                text=self._group_help_text,
                 parse_mode=ParseMode.MARKDOWN
             )
 
     # ==================== PRIVATE CHAT COMMANDS ====================
     
-    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Start command - different for private vs group"""
-        chat = update.effective_chat
-        user = update.effective_user
-        
-        if chat.type in [ChatType.GROUP, ChatType.SUPERGROUP]:
-            # Group - show brief info
-            await update.message.reply_text(
-                f"🤖 **EarnQuest Bot**\n\n"
-                f"I'm here to help and keep this group clean!\n\n"
-                f"🌐 Start earning: {self.website_url}\n"
-                f"💬 DM me for account features",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
-        
-        # Private chat - full menu with Web Apps for offerwalls
-        keyboard = [
-            [InlineKeyboardButton("🔐 Login", callback_data="start_login"),
-             InlineKeyboardButton("📝 Register", callback_data="start_register")],
-            [InlineKeyboardButton("💰 Balance", callback_data="cmd_balance"),
-             InlineKeyboardButton("📊 Stats", callback_data="cmd_stats")],
-            # Open offerwalls directly in Telegram as Web App
-            [InlineKeyboardButton(
-                "🎯 Open Offerwalls", 
-                web_app=WebAppInfo(url=f"{self.website_url}/offerwalls")
-            )],
-            [InlineKeyboardButton("🎯 List Offerwalls", callback_data="cmd_offerwalls")],
-            [InlineKeyboardButton("📊 Surveys", callback_data="cmd_surveys"),
-             InlineKeyboardButton("📝 Tasks", callback_data="cmd_tasks")],
-            [InlineKeyboardButton("👥 Referral", callback_data="cmd_referral"),
-             InlineKeyboardButton("🏆 Leaderboard", callback_data="cmd_leaderboard")],
-            [InlineKeyboardButton("🆘 Support", callback_data="cmd_support"),
-             InlineKeyboardButton("❓ FAQ", callback_data="cmd_faq")],
-            [InlineKeyboardButton("🌐 Visit Website", url=self.website_url)],
-        ]
-        
-        welcome = f"""
-🎉 **Welcome to EarnQuest, {user.first_name}!**
+    # Private-chat /start text; only the name varies
+    WELCOME_TEMPLATE = """
+🎉 **Welcome to EarnQuest, {first_name}!**
 
 Earn money by completing tasks, surveys, and offers!
 
@@ -773,11 +1499,25 @@ Earn money by completing tasks, surveys, and offers!
 
 _Tap a button below to get started!_
 """
+
+    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Start command - different for private vs group"""
+        chat = update.effective_chat
+        user = update.effective_user
         
-        await update.message.reply_text(
-            welcome,
+        if chat.type in [ChatType.GROUP, ChatType.SUPERGROUP]:
+            # Group - show brief info
+            await update.message.reply_text(
+                self._group_start_text,
+                parse_mode=ParseMode.MARKDOWN
+            )
+            return
+        
+        # Private chat - full menu with Web Apps for offerwalls
+        await self._reply(update.message,
+            self.WELCOME_TEMPLATE.format(first_name=user.first_name),
             parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=self._start_markup
         )
 
     async def login_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -786,7 +1526,7 @@ _Tap a button below to get started!_
             await update.message.reply_text("🔐 Please login in private chat: @EarnQuestBot")
             return ConversationHandler.END
         
-        await update.message.reply_text(
+        await self._reply(update.message,
             "📧 **Login to EarnQuest**\n\nPlease enter your email address:",
             parse_mode=ParseMode.MARKDOWN
         )
@@ -796,12 +1536,12 @@ _Tap a button below to get started!_
         """Receive email"""
         email = update.message.text.strip()
         
-        if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
-            await update.message.reply_text("❌ Invalid email. Please try again:")
+        if not EMAIL_RE.match(email):
+            await self._reply(update.message, "❌ Invalid email. Please try again:")
             return AWAITING_EMAIL
         
         context.user_data['login_email'] = email
-        await update.message.reply_text("🔐 Now enter your password:")
+        await self._reply(update.message, "🔐 Now enter your password:")
         return AWAITING_PASSWORD
 
     async def receive_password(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -812,32 +1552,39 @@ _Tap a button below to get started!_
         # Delete password message
         try:
             await update.message.delete()
-        except:
+        except TelegramError:
             pass
         
-        status_msg = await update.effective_chat.send_message("🔄 Logging in...")
+        status_msg = await self._reply(update.effective_message, "🔄 Logging in...")
         
-        response, error = self.api_request('POST', '/auth/login/', data={
+        response, error = await self.api_request('POST', '/auth/login/', data={
             'email': email,
             'password': password
         })
         
         if error:
-            await status_msg.edit_text(f"❌ Connection error. Please try again later.")
+            await self._edit(status_msg, f"❌ Connection error. Please try again later.")
             context.user_data.clear()
             return ConversationHandler.END
         
-        if response.status_code == 200:
-            data = response.json()
-            self.user_sessions[update.effective_user.id] = {
-                'token': data.get('token'),
-                'username': data.get('username'),
-                'user_id': data.get('user_id'),
-                'email': email
-            }
+        # Parsed once; the error branch reads the backend's message from it too
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            data = None
+        
+        if response.status_code == 200 and isinstance(data, dict):
+            session = UserSession(
+                token=data.get('token'),
+                username=data.get('username'),
+                user_id=data.get('user_id'),
+                email=email
+            )
+            self.user_sessions.save(update.effective_user.id, session)
+            self.mirror_session(update.effective_user.id, session)
             
             # Log the login event
-            await self.report_to_backend(
+            self.report_to_backend(
                 event_type='login',
                 data={'platform_user_id': data.get('user_id'), 'username': data.get('username')},
                 telegram_user_id=update.effective_user.id,
@@ -845,7 +1592,7 @@ _Tap a button below to get started!_
                 description=f"User {data.get('username')} logged in via Telegram"
             )
             
-            await status_msg.edit_text(
+            await self._edit(status_msg,
                 f"✅ **Welcome back, {data.get('username')}!**\n\n"
                 f"Use /balance to check your earnings\n"
                 f"Use /referral to get your referral link\n"
@@ -853,46 +1600,44 @@ _Tap a button below to get started!_
                 parse_mode=ParseMode.MARKDOWN
             )
         else:
-            try:
-                error_msg = response.json().get('error', 'Invalid credentials')
-            except:
-                error_msg = 'Login failed'
-            await status_msg.edit_text(f"❌ {error_msg}")
+            error_msg = data.get('error', 'Invalid credentials') if isinstance(data, dict) else 'Login failed'
+            await self._edit(status_msg, f"❌ {error_msg}")
         
-            context.user_data.clear()
+        context.user_data.clear()  # Don't keep the entered password around
         return ConversationHandler.END
 
     async def register_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Start registration"""
+        """Offer registration via the Web App form or step by step in chat"""
         if update.effective_chat.type != ChatType.PRIVATE:
             await update.message.reply_text("📝 Please register in private chat: @EarnQuestBot")
             return ConversationHandler.END
         
-        await update.message.reply_text(
+        await self._reply(update.message,
             "📝 **Create your EarnQuest account!**\n\n"
-            "Choose a username (letters, numbers, underscores):",
-            parse_mode=ParseMode.MARKDOWN
+            "Fill in the form in one step, or register here in chat:",
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=self._register_markup
         )
-        return AWAITING_REG_USERNAME
+        return ConversationHandler.END
 
     async def receive_reg_username(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         username = update.message.text.strip()
-        if len(username) < 3 or not re.match(r'^[\w]+$', username):
-            await update.message.reply_text("❌ Invalid username. Min 3 chars, letters/numbers/underscores:")
+        if len(username) < 3 or not USERNAME_RE.match(username):
+            await self._reply(update.message, "❌ Invalid username. Min 3 chars, letters/numbers/underscores:")
             return AWAITING_REG_USERNAME
         
         context.user_data['reg_username'] = username
-        await update.message.reply_text("📧 Enter your email address:")
+        await self._reply(update.message, "📧 Enter your email address:")
         return AWAITING_REG_EMAIL
 
     async def receive_reg_email(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         email = update.message.text.strip()
-        if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
-            await update.message.reply_text("❌ Invalid email. Please try again:")
+        if not EMAIL_RE.match(email):
+            await self._reply(update.message, "❌ Invalid email. Please try again:")
             return AWAITING_REG_EMAIL
         
         context.user_data['reg_email'] = email
-        await update.message.reply_text("🔐 Create a password (min 6 characters):")
+        await self._reply(update.message, "🔐 Create a password (min 6 characters):")
         return AWAITING_REG_PASSWORD
 
     async def receive_reg_password(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -900,16 +1645,16 @@ _Tap a button below to get started!_
         
         try:
             await update.message.delete()
-        except:
+        except TelegramError:
             pass
         
         if len(password) < 6:
-            await update.effective_chat.send_message("❌ Password too short. Min 6 characters:")
+            await self._reply(update.effective_message, "❌ Password too short. Min 6 characters:")
             return AWAITING_REG_PASSWORD
         
-        status_msg = await update.effective_chat.send_message("🔄 Creating account...")
+        status_msg = await self._reply(update.effective_message, "🔄 Creating account...")
         
-        response, error = self.api_request('POST', '/auth/register/', data={
+        response, error = await self.api_request('POST', '/auth/register/', data={
             'username': context.user_data['reg_username'],
             'email': context.user_data['reg_email'],
             'password': password,
@@ -918,15 +1663,19 @@ _Tap a button below to get started!_
         })
         
         if error:
-            await status_msg.edit_text(f"❌ Connection error. Please try later.")
+            await self._edit(status_msg, f"❌ Connection error. Please try later.")
             context.user_data.clear()
             return ConversationHandler.END
         
-        if response.status_code == 201:
-            data = response.json()
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            data = None
+        
+        if response.status_code == 201 and isinstance(data, dict):
             
             # Log the registration event
-            await self.report_to_backend(
+            self.report_to_backend(
                 event_type='registration',
                 data={'platform_user_id': data.get('user_id'), 'username': data.get('username')},
                 telegram_user_id=update.effective_user.id,
@@ -934,150 +1683,196 @@ _Tap a button below to get started!_
                 description=f"New user {data.get('username')} registered via Telegram"
             )
             
-            await status_msg.edit_text(
-                f"🎉 **Welcome to EarnQuest, {data.get('username')}!**\n\n"
-                f"💰 You received a **$0.10 welcome bonus!**\n\n"
-                f"📧 Check your email to verify your account.\n\n"
-                f"Use /login to access your account.",
-                parse_mode=ParseMode.MARKDOWN
+            await self._edit(status_msg,
+                self.REGISTERED_TEMPLATE.format(username=html.escape(str(data.get('username')))),
+                parse_mode=ParseMode.HTML
             )
         else:
-            try:
-                errors = response.json()
-                error_text = str(errors)
-            except:
-                error_text = 'Registration failed'
-            await status_msg.edit_text(f"❌ {error_text}")
+            error_text = str(data) if data is not None else 'Registration failed'
+            await self._edit(status_msg, f"❌ {error_text}")
         
         context.user_data.clear()
         return ConversationHandler.END
 
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         context.user_data.clear()
-        await update.message.reply_text("❌ Cancelled.")
+        await self._reply(update.message, "❌ Cancelled.")
         return ConversationHandler.END
 
+    async def conversation_timed_out(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Called by ConversationHandler once conversation_timeout passes without a reply"""
+        context.user_data.clear()
+
+    async def logout_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Forget the user's session and anything cached with its token"""
+        session = self.user_sessions.pop(update.effective_user.id)
+        if not session:
+            await self._reply(update.effective_message, "ℹ️ You're not logged in.")
+            return
+        
+        self.mirror_session(update.effective_user.id, None)
+        self.invalidate_cache(session.token)
+        await self._reply(update.effective_message, "👋 Logged out. Use /login to sign in again.")
+
     # ==================== USER FEATURE COMMANDS ====================
     
-    async def balance_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Reply templates, filled with str.format
+    BALANCE_TEMPLATE = (
+        "💰 <b>Your Balance</b>\n\n"
+        "<b>Balance:</b> ${current_balance:.2f}\n"
+        "<b>Total Earned:</b> ${total_earned:.2f}\n"
+        "<b>Qualifying:</b> ${qualifying_earnings:.2f}\n"
+        "<b>Referral Earnings:</b> ${referral_earnings:.2f}\n"
+        "<b>Level:</b> {level}\n\n"
+        "<b>Withdrawal:</b> {status}\n\n"
+        "🌐 Withdraw at: {website}/withdraw"
+    )
+    STATS_TEMPLATE = (
+        "📊 <b>Your Statistics</b>\n\n"
+        "💵 Balance: ${balance:.2f}\n"
+        "💰 Total Earned: ${total_earned:.2f}\n"
+        "📈 Today: ${today_earnings:.2f}\n"
+        "✅ Tasks: {total_tasks}\n"
+        "🔥 Streak: {streak_days} days\n"
+        "👥 Referrals: {total_referrals}\n"
+        "💎 Ref Earnings: ${ref_earnings:.2f}\n\n"
+        "🌐 {website}/dashboard"
+    )
+    # Fields the backend may omit
+    STATS_DEFAULTS = {'balance': 0, 'total_earned': 0, 'today_earnings': 0, 'total_tasks': 0, 'streak_days': 0}
+    REFERRAL_TEMPLATE = (
+        "👥 <b>Your Referral Program</b>\n\n"
+        "📋 Code: <code>{referral_code}</code>\n\n"
+        "🔗 Link:\n{referral_url}\n\n"
+        "📊 <b>Stats:</b>\n"
+        "• Referrals: {total_referrals}\n"
+        "• Earnings: ${referral_earnings:.2f}\n\n"
+        "💰 <b>Earn 10% of all your referrals' earnings!</b>"
+    )
+    REGISTERED_TEMPLATE = (
+        "🎉 <b>Welcome to EarnQuest, {username}!</b>\n\n"
+        "💰 You received a <b>$0.10 welcome bonus!</b>\n\n"
+        "📧 Check your email to verify your account.\n\n"
+        "Use /login to access your account."
+    )
+    TICKET_TEMPLATE = (
+        "✅ <b>Ticket Created!</b>\n\n"
+        "<b>Ticket ID:</b> #{ticket_id}\n"
+        "<b>Category:</b> {category}\n\n"
+        "We'll respond within 24-48 hours.\n"
+        "Check status at: {website}/support"
+    )
+    SURVEY_TIPS = (
+        "\n<b>Tips for Surveys:</b>\n"
+        "✅ Fill out your profile completely\n"
+        "✅ Be consistent with answers\n"
+        "✅ Use a desktop for best experience\n"
+    )
+    FAQ_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🎯 Offerwalls", callback_data="faq_offerwall"),
+         InlineKeyboardButton("📝 Tasks", callback_data="faq_task")],
+        [InlineKeyboardButton("💰 Withdrawals", callback_data="faq_withdraw"),
+         InlineKeyboardButton("📊 Minimum", callback_data="faq_minimum")],
+        [InlineKeyboardButton("👥 Referrals", callback_data="faq_referral"),
+         InlineKeyboardButton("🚿 Faucet", callback_data="faq_faucet")],
+        [InlineKeyboardButton("💵 How to Earn", callback_data="faq_earn"),
+         InlineKeyboardButton("🚀 Getting Started", callback_data="faq_start")],
+    ])
+    # Shorter variant shown from the main menu button
+    SUPPORT_SHORT_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("💰 Withdrawal", callback_data="support_withdrawal")],
+        [InlineKeyboardButton("📝 Task", callback_data="support_task")],
+        [InlineKeyboardButton("🔐 Account", callback_data="support_account")],
+        [InlineKeyboardButton("❓ Other", callback_data="support_other")],
+    ])
+    SUPPORT_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("💰 Withdrawal Issue", callback_data="support_withdrawal")],
+        [InlineKeyboardButton("📝 Task Problem", callback_data="support_task")],
+        [InlineKeyboardButton("🔐 Account Issue", callback_data="support_account")],
+        [InlineKeyboardButton("🐛 Bug Report", callback_data="support_bug")],
+        [InlineKeyboardButton("❓ Other", callback_data="support_other")],
+    ])
+    
+    @require_login()
+    async def balance_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, token: str):
         """Check balance"""
-        user_id = update.effective_user.id
-        token = self.get_user_token(user_id)
-        
-        if not token:
-            await update.message.reply_text("🔐 Please /login first!")
+        data = await self._authed_get(update.effective_message, '/profile/', token, "❌ Failed to fetch balance. Try /login again.")
+        if data is None:
             return
         
-        response, error = self.api_request('GET', '/profile/', token=token)
-        
-        if error or response.status_code != 200:
-            await update.message.reply_text("❌ Failed to fetch balance. Try /login again.")
-            return
-        
-        data = response.json()
         withdrawal_info = data.get('withdrawal_info', {})
         can_withdraw = withdrawal_info.get('can_withdraw', False)
         remaining = withdrawal_info.get('remaining_to_unlock', 0)
         
         status = "✅ Ready to withdraw!" if can_withdraw else f"⏳ Need ${remaining:.2f} more qualifying earnings"
         
-        await update.message.reply_text(
-            f"💰 **Your Balance**\n\n"
-            f"**Balance:** ${float(data.get('current_balance', 0)):.2f}\n"
-            f"**Total Earned:** ${float(data.get('total_earned', 0)):.2f}\n"
-            f"**Qualifying:** ${float(data.get('qualifying_earnings', 0)):.2f}\n"
-            f"**Referral Earnings:** ${float(data.get('referral_earnings', 0)):.2f}\n"
-            f"**Level:** {data.get('level', 'Bronze')}\n\n"
-            f"**Withdrawal:** {status}\n\n"
-            f"🌐 Withdraw at: {self.website_url}/withdraw",
-            parse_mode=ParseMode.MARKDOWN
+        await self._reply(update.effective_message,
+            self.BALANCE_TEMPLATE.format(
+                current_balance=float(data.get('current_balance', 0)),
+                total_earned=float(data.get('total_earned', 0)),
+                qualifying_earnings=float(data.get('qualifying_earnings', 0)),
+                referral_earnings=float(data.get('referral_earnings', 0)),
+                level=html.escape(str(data.get('level', 'Bronze'))),
+                status=status,
+                website=self.website_url,
+            ),
+            parse_mode=ParseMode.HTML
         )
 
-    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_login()
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, token: str):
         """Show stats"""
-        user_id = update.effective_user.id
-        token = self.get_user_token(user_id)
-        
-        if not token:
-            await update.message.reply_text("🔐 Please /login first!")
-            return
-        
-        response, error = self.api_request('GET', '/dashboard/stats/', token=token)
-        
-        if error or response.status_code != 200:
-            await update.message.reply_text("❌ Failed to fetch stats.")
+        data = await self._authed_get(update.effective_message, '/dashboard/stats/', token, "❌ Failed to fetch stats.")
+        if data is None:
             return
         
-        data = response.json()
-        ref = data.get('referral_stats', {})
-        
-        await update.message.reply_text(
-            f"📊 **Your Statistics**\n\n"
-            f"💵 Balance: ${data.get('balance', 0):.2f}\n"
-            f"💰 Total Earned: ${data.get('total_earned', 0):.2f}\n"
-            f"📈 Today: ${data.get('today_earnings', 0):.2f}\n"
-            f"✅ Tasks: {data.get('total_tasks', 0)}\n"
-            f"🔥 Streak: {data.get('streak_days', 0)} days\n"
-            f"👥 Referrals: {ref.get('total_referrals', 0)}\n"
-            f"💎 Ref Earnings: ${ref.get('earnings', 0):.2f}\n\n"
-            f"🌐 {self.website_url}/dashboard",
-            parse_mode=ParseMode.MARKDOWN
+        ref = data.get('referral_stats') or {}
+        
+        # Top-level fields straight from the response (defaults for missing ones),
+        # plus the two nested referral figures
+        await self._reply(update.effective_message,
+            self.STATS_TEMPLATE.format_map({
+                **self.STATS_DEFAULTS,
+                **data,
+                'total_referrals': ref.get('total_referrals', 0),
+                'ref_earnings': ref.get('earnings', 0),
+                'website': self.website_url,
+            }),
+            parse_mode=ParseMode.HTML
         )
 
-    async def referral_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_login()
+    async def referral_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, token: str):
         """Show referral info"""
-        user_id = update.effective_user.id
-        token = self.get_user_token(user_id)
-        
-        if not token:
-            await update.message.reply_text("🔐 Please /login first!")
-            return
-        
-        response, error = self.api_request('GET', '/my-referral-info/', token=token)
-        
-        if error or response.status_code != 200:
-            await update.message.reply_text("❌ Failed to fetch referral info.")
+        data = await self._authed_get(update.effective_message, '/my-referral-info/', token, "❌ Failed to fetch referral info.")
+        if data is None:
             return
         
-        data = response.json()
         
-        await update.message.reply_text(
-            f"👥 **Your Referral Program**\n\n"
-            f"📋 Code: `{data.get('referral_code', 'N/A')}`\n\n"
-            f"🔗 Link:\n{data.get('referral_url', 'N/A')}\n\n"
-            f"📊 **Stats:**\n"
-            f"• Referrals: {data.get('total_referrals', 0)}\n"
-            f"• Earnings: ${data.get('referral_earnings', 0):.2f}\n\n"
-            f"💰 **Earn 10% of all your referrals' earnings!**",
-            parse_mode=ParseMode.MARKDOWN
+        await self._reply(update.effective_message,
+            self.REFERRAL_TEMPLATE.format(
+                referral_code=html.escape(str(data.get('referral_code', 'N/A'))),
+                referral_url=html.escape(str(data.get('referral_url', 'N/A'))),
+                total_referrals=data.get('total_referrals', 0),
+                referral_earnings=data.get('referral_earnings', 0),
+            ),
+            parse_mode=ParseMode.HTML
         )
 
-    async def leaderboard_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_login()
+    async def leaderboard_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, token: str):
         """Show leaderboard"""
-        user_id = update.effective_user.id
-        token = self.get_user_token(user_id)
-        
-        if not token:
-            await update.message.reply_text("🔐 Please /login first!")
+        data = await self._authed_get(update.effective_message, '/leaderboard/top-earners/', token, "❌ Failed to fetch leaderboard.")
+        if data is None:
             return
         
-        response, error = self.api_request('GET', '/leaderboard/top-earners/', token=token)
-        
-        if error or response.status_code != 200:
-            await update.message.reply_text("❌ Failed to fetch leaderboard.")
-            return
-        
-        data = response.json()
         top = data.get('top_earners', [])[:10]
         
-        medals = ['🥇', '🥈', '🥉'] + ['🏅'] * 7
-        
-        msg = "🏆 **Top Earners**\n\n"
-        for i, user in enumerate(top):
-            msg += f"{medals[i]} {user.get('username')} - ${user.get('earnings', 0):.2f}\n"
-        
-        msg += f"\n🌐 {self.website_url}/leaderboard"
-        await update.message.reply_text(msg, parse_mode=ParseMode.MARKDOWN)
+        msg = "🏆 <b>Top Earners</b>\n\n" + "".join(
+            f"{medal} {html.escape(str(user.get('username')))} - ${user.get('earnings', 0):.2f}\n"
+            for medal, user in zip(_MEDALS, top)
+        ) + f"\n🌐 {self.website_url}/leaderboard"
+        await self._reply(update.effective_message, msg, parse_mode=ParseMode.HTML)
 
     # Offerwall service names mapping
     OFFERWALL_NAMES = {
@@ -1097,241 +1892,197 @@ _Tap a button below to get started!_
         'offery': 'Offery',
     }
 
-    async def offerwalls_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_login(
+        "🔐 <b>Login Required</b>\n\n"
+        "Please /login to access offerwalls and start earning!\n\n"
+        "Or visit: {website}/offerwalls"
+    )
+    async def offerwalls_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, token: str):
         """Show available offerwalls as Telegram Web Apps (opens in-app)"""
-        user_id = update.effective_user.id
-        token = self.get_user_token(user_id)
-        session = self.user_sessions.get(user_id, {})
-        
-        if not token:
-            await update.message.reply_text(
-                "🔐 **Login Required**\n\n"
-                "Please /login to access offerwalls and start earning!\n\n"
-                f"Or visit: {self.website_url}/offerwalls",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
-        
-        status_msg = await update.message.reply_text("🔄 Loading offerwalls...")
-        
-        # Fetch available offerwall keys
-        response, error = self.api_request('GET', '/keys/', token=token)
+        # Fetch available offerwall keys; fast (e.g. cached) answers skip the placeholder
+        request = asyncio.ensure_future(self.api_request('GET', '/keys/', token=token))
+        status_msg = await self._placeholder(update.effective_message, request, "🔄 Loading offerwalls...")
+        response, error = await request
         
         if error or response.status_code != 200:
-            await status_msg.edit_text("❌ Failed to fetch offerwalls. Try again later.")
+            await self._respond(update.effective_message, status_msg, "❌ Failed to fetch offerwalls. Try again later.")
             return
         
-        data = response.json()
+        data = orjson.loads(response.content)
         available_keys = data.get('keys', {})
         
         if not available_keys:
-            await status_msg.edit_text(
-                "📭 **No Offerwalls Available**\n\n"
-                f"Check back later or visit: {self.website_url}/offerwalls",
-                parse_mode=ParseMode.MARKDOWN
-            )
+            await self._respond(update.effective_message, status_msg,
+                self._no_offerwalls_text, parse_mode=ParseMode.HTML)
             return
         
-        # Filter to known offerwall services and fetch iframe URLs
+        # Filter to known offerwall services (at most 12 are shown) and fetch their iframe URLs concurrently
+        services = [k for k in available_keys if k in self.OFFERWALL_NAMES][:12]
+        iframe_results = await asyncio.gather(*(
+            self.api_request('GET', self.IFRAME_ENDPOINT.format(service), token=token) for service in services
+        ))
         offerwalls = []
-        for service in available_keys.keys():
-            if service in self.OFFERWALL_NAMES:
-                # Fetch iframe URL for this service
-                iframe_response, iframe_error = self.api_request('GET', f'/services/{service}/iframe/', token=token)
-                iframe_url = None
-                if iframe_response and iframe_response.status_code == 200:
-                    iframe_data = iframe_response.json()
-                    iframe_url = iframe_data.get('iframe_url')
-                
-                offerwalls.append({
-                    'service': service,
-                    'name': self.OFFERWALL_NAMES[service],
-                    'iframe_url': iframe_url
-                })
+        for service, (iframe_response, iframe_error) in zip(services, iframe_results):
+            iframe_url = None
+            if iframe_response and iframe_response.status_code == 200:
+                iframe_data = orjson.loads(iframe_response.content)
+                iframe_url = iframe_data.get('iframe_url')
+            
+            offerwalls.append({
+                'service': service,
+                'name': self.OFFERWALL_NAMES[service],
+                'iframe_url': iframe_url
+            })
         
         if not offerwalls:
-            await status_msg.edit_text(
-                "📭 **No Offerwalls Available**\n\n"
-                f"Visit: {self.website_url}/offerwalls",
-                parse_mode=ParseMode.MARKDOWN
-            )
+            await self._respond(update.effective_message, status_msg,
+                self._no_offerwalls_text, parse_mode=ParseMode.HTML)
             return
         
         # Build message with offerwall list
-        msg = "🎯 **Available Offerwalls**\n\n"
-        msg += "Tap a button to open the offerwall directly in Telegram!\n"
-        msg += "_Your account is linked - earnings auto-credited._\n\n"
-        
-        keyboard = []
-        
-        for wall in offerwalls[:12]:  # Limit to 12
-            service = wall['service']
-            name = wall['name']
-            iframe_url = wall.get('iframe_url')
-            
-            msg += f"✅ **{name}**\n"
-            
-            # Use WebAppInfo to open iframe directly in Telegram (in-app browser)
-            if iframe_url:
-                # WebAppInfo opens as a Telegram Mini App (in-app web view)
-                keyboard.append([InlineKeyboardButton(
-                    f"🎯 {name}", 
-                    web_app=WebAppInfo(url=iframe_url)
-                )])
-            else:
-                # Fallback: Open frontend offerwall page as Web App
-                wall_url = f"{self.website_url}/offerwalls?service={service}"
-                keyboard.append([InlineKeyboardButton(
-                    f"🎯 {name}", 
-                    web_app=WebAppInfo(url=wall_url)
-                )])
+        msg = (
+            "🎯 <b>Available Offerwalls</b>\n\n"
+            "Tap a button to open the offerwall directly in Telegram!\n"
+            "<i>Your account is linked - earnings auto-credited.</i>\n\n"
+            + "".join(f"✅ <b>{wall['name']}</b>\n" for wall in offerwalls)
+            + "\n💡 <i>Opens inside Telegram - no external browser needed!</i>"
+            "\n💰 <i>Complete offers to earn money!</i>"
+        )
         
-        msg += f"\n💡 _Opens inside Telegram - no external browser needed!_"
-        msg += f"\n💰 _Complete offers to earn money!_"
+        # WebAppInfo opens the iframe as a Telegram Mini App (in-app web view);
+        # without one, fall back to the frontend offerwall page
+        keyboard = [
+            [InlineKeyboardButton(
+                f"🎯 {wall['name']}",
+                web_app=WebAppInfo(url=wall['iframe_url'] or f"{self.website_url}/offerwalls?service={wall['service']}")
+            )]
+            for wall in offerwalls
+        ]
         
-        await status_msg.edit_text(
+        await self._respond(update.effective_message, status_msg,
             msg,
-            parse_mode=ParseMode.MARKDOWN,
+            parse_mode=ParseMode.HTML,
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-    async def tasks_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_login(
+        "🔐 <b>Login Required</b>\n\n"
+        "Please /login to view and complete tasks!\n\n"
+        "Or visit: {website}/tasks"
+    )
+    async def tasks_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, token: str):
         """Show available tasks"""
-        user_id = update.effective_user.id
-        token = self.get_user_token(user_id)
-        
-        if not token:
-            await update.message.reply_text(
-                "🔐 **Login Required**\n\n"
-                "Please /login to view and complete tasks!\n\n"
-                f"Or visit: {self.website_url}/tasks",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
-        
-        status_msg = await update.message.reply_text("🔄 Loading tasks...")
-        
-        response, error = self.api_request('GET', '/tasks/', token=token)
+        # Fast (e.g. cached) answers skip the placeholder
+        request = asyncio.ensure_future(self.api_request('GET', self.TASKS_SUMMARY_ENDPOINT, token=token))
+        status_msg = await self._placeholder(update.effective_message, request, "🔄 Loading tasks...")
+        response, error = await request
         
         if error or response.status_code != 200:
-            await status_msg.edit_text("❌ Failed to fetch tasks. Try again later.")
+            await self._respond(update.effective_message, status_msg, "❌ Failed to fetch tasks. Try again later.")
             return
         
-        data = response.json()
+        data = orjson.loads(response.content)
         tasks = data if isinstance(data, list) else data.get('results', data.get('tasks', []))
+        if isinstance(data, dict) and 'total_tasks' in data:
+            # Summary response: totals computed by the backend
+            total_tasks = data['total_tasks']
+            total_reward = float(data.get('total_reward', 0))
+        else:
+            # Paginated responses report the full count; the page's rewards only add up
+            # to the total when the page holds every task
+            total_tasks = data.get('count', len(tasks)) if isinstance(data, dict) else len(tasks)
+            total_reward = (sum(float(t.get('reward', t.get('amount', 0))) for t in tasks)
+                            if total_tasks <= len(tasks) else None)
         
         if not tasks:
-            await status_msg.edit_text(
-                "📭 **No Tasks Available**\n\n"
-                "Check back later for new earning opportunities!\n\n"
-                f"🎯 Try offerwalls instead: /offerwalls\n"
-                f"🌐 {self.website_url}/tasks",
-                parse_mode=ParseMode.MARKDOWN
-            )
+            await self._respond(update.effective_message, status_msg,
+                self._no_tasks_text, parse_mode=ParseMode.HTML)
             return
         
-        # Count and categorize tasks
-        total_tasks = len(tasks)
-        total_reward = sum(float(t.get('reward', t.get('amount', 0))) for t in tasks)
-        
-        msg = f"📝 **Available Tasks: {total_tasks}**\n\n"
-        msg += f"💰 Total Potential: ${total_reward:.2f}\n\n"
-        
-        # Show top 5 tasks
-        msg += "**Top Tasks:**\n"
+        # Top 5 tasks, collected and joined once
+        lines = [f"📝 <b>Available Tasks: {total_tasks}</b>\n\n"]
+        if total_reward is not None:
+            lines.append(f"💰 Total Potential: ${total_reward:.2f}\n\n")
+        lines.append("<b>Top Tasks:</b>\n")
         for i, task in enumerate(tasks[:5], 1):
-            title = task.get('title', task.get('name', 'Task'))[:40]
+            title = html.escape(task.get('title', task.get('name', 'Task'))[:40])
             reward = float(task.get('reward', task.get('amount', 0)))
             category = task.get('category', {})
-            cat_name = category.get('name', '') if isinstance(category, dict) else str(category)
+            cat_name = html.escape(category.get('name', '') if isinstance(category, dict) else str(category))
             
-            msg += f"{i}. {title}\n"
-            msg += f"   💵 ${reward:.2f}"
-            if cat_name:
-                msg += f" | 📂 {cat_name}"
-            msg += "\n"
+            lines.append(f"{i}. {title}\n   💵 ${reward:.2f}" + (f" | 📂 {cat_name}\n" if cat_name else "\n"))
         
         if total_tasks > 5:
-            msg += f"\n_...and {total_tasks - 5} more tasks!_\n"
+            lines.append(f"\n<i>...and {total_tasks - 5} more tasks!</i>\n")
         
-        msg += f"\n💡 _Complete tasks on our website to earn!_"
+        lines.append("\n💡 <i>Complete tasks on our website to earn!</i>")
+        msg = "".join(lines)
         
-        keyboard = [
-            [InlineKeyboardButton("📝 View All Tasks", url=f"{self.website_url}/tasks")],
-            [InlineKeyboardButton("🎯 Offerwalls", callback_data="cmd_offerwalls"),
-             InlineKeyboardButton("💰 Balance", callback_data="cmd_balance")],
-        ]
-        
-        await status_msg.edit_text(
+        await self._respond(update.effective_message, status_msg,
             msg,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            parse_mode=ParseMode.HTML,
+            reply_markup=self._tasks_markup
         )
 
-    async def surveys_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_login(
+        "🔐 <b>Login Required</b>\n\n"
+        "Please /login to access surveys!\n\n"
+        "Or visit: {website}/offerwalls"
+    )
+    async def surveys_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, token: str):
         """Show available surveys with direct iframe links"""
-        user_id = update.effective_user.id
-        token = self.get_user_token(user_id)
-        
-        if not token:
-                    await update.message.reply_text(
-                "🔐 **Login Required**\n\n"
-                "Please /login to access surveys!\n\n"
-                f"Or visit: {self.website_url}/offerwalls",
-                parse_mode=ParseMode.MARKDOWN
-                    )
-                    return
-                
-        status_msg = await update.message.reply_text("🔄 Loading surveys with direct links...")
+        status_msg = await self._reply(update.effective_message, "🔄 Loading surveys with direct links...")
+        
+        # CPX Research and BitLabs iframe URLs plus the CPX survey list, fetched concurrently
+        (iframe_response, _), (bitlabs_response, _), (response, error) = await asyncio.gather(
+            self.api_request('GET', self.IFRAME_ENDPOINT.format('cpx'), token=token),
+            self.api_request('GET', self.IFRAME_ENDPOINT.format('bitlabs'), token=token),
+            self.api_request('GET', '/cpx/surveys/', token=token),
+        )
         
-        # Fetch CPX Research iframe URL directly
         cpx_iframe_url = None
-        iframe_response, iframe_error = self.api_request('GET', '/services/cpx/iframe/', token=token)
         if iframe_response and iframe_response.status_code == 200:
-            iframe_data = iframe_response.json()
+            iframe_data = orjson.loads(iframe_response.content)
             cpx_iframe_url = iframe_data.get('iframe_url')
         
-        # Also try BitLabs surveys
         bitlabs_iframe_url = None
-        bitlabs_response, _ = self.api_request('GET', '/services/bitlabs/iframe/', token=token)
         if bitlabs_response and bitlabs_response.status_code == 200:
-            bitlabs_data = bitlabs_response.json()
+            bitlabs_data = orjson.loads(bitlabs_response.content)
             bitlabs_iframe_url = bitlabs_data.get('iframe_url')
         
-        # Fetch CPX Research survey list for display
-        response, error = self.api_request('GET', '/cpx/surveys/', token=token)
-        
         surveys = []
         if response and response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             surveys = data.get('surveys', [])[:8]  # Limit to 8
         
-        msg = "📊 **Available Surveys**\n\n"
-        msg += "_Your account is linked - tap to start surveys!_\n\n"
+        lines = [
+            "📊 <b>Available Surveys</b>\n\n"
+            "<i>Your account is linked - tap to start surveys!</i>\n\n"
+        ]
         
         if surveys:
-            msg += f"Found **{len(surveys)}** surveys from CPX Research!\n\n"
+            lines.append(f"Found <b>{len(surveys)}</b> surveys from CPX Research!\n\n")
             
             total_payout = 0
             for i, survey in enumerate(surveys[:5], 1):
                 payout = float(survey.get('payout', survey.get('payout_original', 0)))
-                duration = survey.get('length_of_interview', survey.get('loi', 'N/A'))
+                duration = html.escape(str(survey.get('length_of_interview', survey.get('loi', 'N/A'))))
                 total_payout += payout
                 
-                msg += f"{i}. 💵 **${payout:.2f}** - ~{duration} min\n"
+                lines.append(f"{i}. 💵 <b>${payout:.2f}</b> - ~{duration} min\n")
             
             if len(surveys) > 5:
-                msg += f"\n_...and {len(surveys) - 5} more surveys!_\n"
+                lines.append(f"\n<i>...and {len(surveys) - 5} more surveys!</i>\n")
             
-            msg += f"\n💰 **Total Potential:** ${total_payout:.2f}\n"
+            lines.append(f"\n💰 <b>Total Potential:</b> ${total_payout:.2f}\n")
         else:
-            msg += "Survey data loading...\n"
-            msg += "Tap the button below to browse available surveys!\n\n"
+            lines.append(
+                "Survey data loading...\n"
+                "Tap the button below to browse available surveys!\n\n"
+            )
         
-        msg += "\n**Tips for Surveys:**\n"
-        msg += "✅ Fill out your profile completely\n"
-        msg += "✅ Be consistent with answers\n"
-        msg += "✅ Use a desktop for best experience\n"
+        lines.append(self.SURVEY_TIPS)
+        msg = "".join(lines)
         
         keyboard = []
         
@@ -1358,9 +2109,9 @@ _Tap a button below to get started!_
             InlineKeyboardButton("🎯 All Offerwalls", callback_data="cmd_offerwalls")
         ])
         
-        await status_msg.edit_text(
+        await self._edit(status_msg,
             msg,
-            parse_mode=ParseMode.MARKDOWN,
+            parse_mode=ParseMode.HTML,
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
@@ -1372,39 +2123,29 @@ _Tap a button below to get started!_
             await update.message.reply_text("🆘 For support, please DM me: @EarnQuestBot")
             return ConversationHandler.END
         
-        keyboard = [
-            [InlineKeyboardButton("💰 Withdrawal Issue", callback_data="support_withdrawal")],
-            [InlineKeyboardButton("📝 Task Problem", callback_data="support_task")],
-            [InlineKeyboardButton("🔐 Account Issue", callback_data="support_account")],
-            [InlineKeyboardButton("🐛 Bug Report", callback_data="support_bug")],
-            [InlineKeyboardButton("❓ Other", callback_data="support_other")],
-        ]
-        
-        await update.message.reply_text(
-            "🆘 **EarnQuest Support**\n\n"
+        await self._reply(update.message,
+            "🆘 <b>EarnQuest Support</b>\n\n"
             "What do you need help with?",
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            parse_mode=ParseMode.HTML,
+            reply_markup=self.SUPPORT_KEYBOARD
         )
         return AWAITING_SUPPORT_MESSAGE
 
     async def receive_support_category(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle support category selection"""
         query = update.callback_query
-        await query.answer()
-        
         category = query.data.replace('support_', '')
         context.user_data['support_category'] = category
         
-        await query.edit_message_text(
-            f"📝 **Support - {category.title()}**\n\n"
-            f"Please describe your issue in detail:\n"
-            f"• What were you trying to do?\n"
-            f"• What happened?\n"
-            f"• Any error messages?\n\n"
-            f"Type /cancel to exit.",
-            parse_mode=ParseMode.MARKDOWN
-        )
+        await self._answering(query, query.edit_message_text(
+            f"📝 <b>Support - {html.escape(category.title())}</b>\n\n"
+            "Please describe your issue in detail:\n"
+            "• What were you trying to do?\n"
+            "• What happened?\n"
+            "• Any error messages?\n\n"
+            "Type /cancel to exit.",
+            parse_mode=ParseMode.HTML
+        ))
         return AWAITING_SUPPORT_MESSAGE
 
     async def receive_support_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1414,12 +2155,12 @@ _Tap a button below to get started!_
         category = context.user_data.get('support_category', 'general')
         
         # Get session info
-        session = self.user_sessions.get(user.id, {})
+        token = self.get_user_token(user.id)
         
         # Try to create ticket via API
-        if session.get('token'):
-            response, error = self.api_request('POST', '/support/tickets/',
-                token=session['token'],
+        if token:
+            response, error = await self.api_request('POST', '/support/tickets/',
+                token=token,
                 data={
                     'subject': f'[Telegram] {category.title()} Issue',
                     'message': message,
@@ -1428,10 +2169,10 @@ _Tap a button below to get started!_
             )
             
             if response and response.status_code == 201:
-                ticket = response.json()
+                ticket = orjson.loads(response.content)
                 
                 # Log the support ticket event
-                await self.report_to_backend(
+                self.report_to_backend(
                     event_type='support_ticket',
                     data={'ticket_id': ticket.get('id'), 'category': category, 'subject': f'[Telegram] {category.title()} Issue'},
                     telegram_user_id=user.id,
@@ -1439,24 +2180,21 @@ _Tap a button below to get started!_
                     description=f"Support ticket #{ticket.get('id')} created: {category.title()}"
                 )
                 
-                await update.message.reply_text(
-                    f"✅ **Ticket Created!**\n\n"
-                    f"**Ticket ID:** #{ticket.get('id')}\n"
-                    f"**Category:** {category.title()}\n\n"
-                    f"We'll respond within 24-48 hours.\n"
-                    f"Check status at: {self.website_url}/support",
-                    parse_mode=ParseMode.MARKDOWN
+                await self._reply(update.message,
+                    self.TICKET_TEMPLATE.format(
+                        ticket_id=html.escape(str(ticket.get('id'))),
+                        category=html.escape(category.title()),
+                        website=self.website_url,
+                    ),
+                    parse_mode=ParseMode.HTML
                 )
                 context.user_data.clear()
                 return ConversationHandler.END
         
         # Fallback - store for manual handling
-        await update.message.reply_text(
-            f"✅ **Message Received!**\n\n"
-            f"Our team will review your message.\n\n"
-            f"📧 You can also email: {self.support_email}\n"
-            f"🌐 Or visit: {self.website_url}/support",
-            parse_mode=ParseMode.MARKDOWN
+        await self._reply(update.message,
+            self._support_received_text,
+            parse_mode=ParseMode.HTML
         )
         
         context.user_data.clear()
@@ -1464,135 +2202,139 @@ _Tap a button below to get started!_
 
     async def faq_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show FAQ"""
-        keyboard = [
-            [InlineKeyboardButton("🎯 Offerwalls", callback_data="faq_offerwall"),
-             InlineKeyboardButton("📝 Tasks", callback_data="faq_task")],
-            [InlineKeyboardButton("💰 Withdrawals", callback_data="faq_withdraw"),
-             InlineKeyboardButton("📊 Minimum", callback_data="faq_minimum")],
-            [InlineKeyboardButton("👥 Referrals", callback_data="faq_referral"),
-             InlineKeyboardButton("🚿 Faucet", callback_data="faq_faucet")],
-            [InlineKeyboardButton("💵 How to Earn", callback_data="faq_earn"),
-             InlineKeyboardButton("🚀 Getting Started", callback_data="faq_start")],
-        ]
-        
-        await update.message.reply_text(
-            "❓ **Frequently Asked Questions**\n\nSelect a topic:",
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup(keyboard)
+        await self._reply(update.effective_message,
+            "❓ <b>Frequently Asked Questions</b>\n\nSelect a topic:",
+            parse_mode=ParseMode.HTML,
+            reply_markup=self.FAQ_KEYBOARD
         )
 
+    # ==================== COMMAND DISPATCH ====================
+    
+    async def dispatch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Route /commands through one table lookup instead of a handler per command"""
+        words = update.effective_message.text.split()
+        command, _, target = words[0][1:].partition("@")
+        if target and target.lower() != context.bot.username.lower():
+            return  # Addressed to another bot in the group
+        
+        handler = self._cmd_table.get(command.lower())
+        if handler:
+            context.args = words[1:]  # What CommandHandler would have set
+            await handler(update, context)
+
     # ==================== CALLBACK HANDLER ====================
     
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle all button callbacks"""
+        """Handle all button callbacks, dispatching on the callback_data prefix"""
         query = update.callback_query
-        await query.answer()
-        
-        data = query.data
-        
-        # Start actions
-        if data == "start_login":
-            await query.message.reply_text("📧 Enter your email:")
+        prefix, _, rest = query.data.partition("_")
+        handler = self._cb_dispatch.get(prefix)
+        return await self._answering(query, handler(rest, update, context) if handler else None)
+
+    @staticmethod
+    async def _answering(query, work=None):
+        """Answer `query` (stopping the button's spinner) while awaiting `work`, rather than before it starts"""
+        answer = asyncio.ensure_future(query.answer())
+        try:
+            return await work if work is not None else None
+        finally:
+            try:
+                await answer
+            except TelegramError as e:  # e.g. the query is too old; the handler's reply still went out
+                logger.debug("Callback answer failed: %s", e)
+
+    async def _handle_start_cb(self, action: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """start_login / start_register: enter the matching conversation"""
+        message = update.callback_query.message
+        if action == "login":
+            await self._reply(message, "📧 Enter your email:")
             return AWAITING_EMAIL
         
-        if data == "start_register":
-            await query.message.reply_text("👤 Choose a username:")
+        if action == "register":
+            await self._reply(message, "👤 Choose a username (letters, numbers, underscores):")
             return AWAITING_REG_USERNAME
-        
-        # Command shortcuts
-        if data == "cmd_balance":
-            # Simulate balance command
-            update.message = query.message
-            await self.balance_command(update, context)
-            return
-        
-        if data == "cmd_stats":
-            update.message = query.message
-            await self.stats_command(update, context)
-            return
-        
-        if data == "cmd_referral":
-            update.message = query.message
-            await self.referral_command(update, context)
-            return
-        
-        if data == "cmd_leaderboard":
-            update.message = query.message
-            await self.leaderboard_command(update, context)
-            return
-        
-        if data == "cmd_offerwalls":
-            update.message = query.message
-            await self.offerwalls_command(update, context)
-            return
-        
-        if data == "cmd_tasks":
-            update.message = query.message
-            await self.tasks_command(update, context)
-            return
-        
-        if data == "cmd_surveys":
-            update.message = query.message
-            await self.surveys_command(update, context)
-            return
-        
-        
-        if data == "cmd_support":
-            keyboard = [
-                [InlineKeyboardButton("💰 Withdrawal", callback_data="support_withdrawal")],
-                [InlineKeyboardButton("📝 Task", callback_data="support_task")],
-                [InlineKeyboardButton("🔐 Account", callback_data="support_account")],
-                [InlineKeyboardButton("❓ Other", callback_data="support_other")],
-            ]
-            await query.edit_message_text(
-                "🆘 **Support**\n\nWhat do you need help with?",
-                parse_mode=ParseMode.MARKDOWN,
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return
-        
-        if data == "cmd_faq":
-            update.message = query.message
-            await self.faq_command(update, context)
+
+    async def _handle_cmd_cb(self, command: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """cmd_*: menu shortcuts for the slash commands"""
+        # The command handlers reply via update.effective_message,
+        # which is the message carrying the button
+        handler = self._cb_table.get(command)
+        if handler:
+            await handler(update, context)
             return
         
-        # Support categories
-        if data.startswith("support_"):
-            context.user_data['support_category'] = data.replace('support_', '')
-            await query.edit_message_text(
-                "📝 Describe your issue in detail:\n\n/cancel to exit"
+        if command == "support":
+            await self._edit(update.callback_query.message,
+                "🆘 <b>Support</b>\n\nWhat do you need help with?",
+                parse_mode=ParseMode.HTML,
+                reply_markup=self.SUPPORT_SHORT_KEYBOARD
             )
-            return AWAITING_SUPPORT_MESSAGE
-        
-        # FAQ answers
-        if data.startswith("faq_"):
-            topic = data.replace("faq_", "")
-            if topic in self.knowledge_base:
-                answer = self.knowledge_base[topic].format(
-                    website=self.website_url, 
-                    email=self.support_email
-                )
-                await query.edit_message_text(answer, parse_mode=ParseMode.MARKDOWN)
+
+    async def _handle_support_cb(self, category: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """support_*: remember the category and ask for the issue"""
+        context.user_data['support_category'] = category
+        await self._edit(update.callback_query.message,
+            "📝 Describe your issue in detail:\n\n/cancel to exit"
+        )
+        return AWAITING_SUPPORT_MESSAGE
+
+    async def _handle_faq_cb(self, topic: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """faq_*: show the knowledge-base answer"""
+        answer = self.knowledge_base.get(topic)
+        if answer:
+            await self._edit(update.callback_query.message, answer, parse_mode=ParseMode.MARKDOWN)
 
     # ==================== MESSAGE ROUTER ====================
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Route messages based on chat type"""
-        chat = update.effective_chat
-        
-        if chat.type in [ChatType.GROUP, ChatType.SUPERGROUP]:
-            await self.handle_group_message(update, context)
+        """Route group text; the handler's filter already restricts this to groups"""
         # Private messages handled by conversation handlers
+        await self.handle_group_message(update, context)
 
     # ==================== SCHEDULED TASKS ====================
     
-    async def scheduled_post_job(self, context: ContextTypes.DEFAULT_TYPE):
-        """Job to check for scheduled posts"""
-        await self.fetch_scheduled_posts(context)
+    async def periodic_tick(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job to check scheduled posts and sync settings when due (concurrently), then re-arm itself"""
+        jobs = [self.fetch_scheduled_posts(context)]
+        if time.monotonic() >= self._settings_due:
+            jobs.append(self.fetch_mod_settings())
+        next_in = (await asyncio.gather(*jobs, return_exceptions=True))[0]
+        if isinstance(next_in, BaseException):
+            next_in = None
+        
+        # Wake for the next due post, but no later than the next settings sync
+        delay = self.post_poll_default if next_in is None else next_in
+        delay = min(self.post_poll_max, delay, self._settings_due - time.monotonic())
+        delay = max(self.post_poll_min, delay)
+        context.job_queue.run_once(self.periodic_tick, delay, name='periodic_tick')
 
-    async def sync_settings_job(self, context: ContextTypes.DEFAULT_TYPE):
-        """Job to sync moderation settings"""
-        await self.fetch_mod_settings()
+    async def _gc(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job to evict stale per-user state so long-running bots don't leak memory"""
+        now = time.monotonic()
+        
+        # Warnings: forget users with no new warning within warning_ttl
+        for user_id, warned_at in list(self.warned_at.items()):
+            if now - warned_at >= self.warning_ttl:
+                del self.warned_at[user_id]
+                self.warned_users.pop(user_id, None)
+        
+        # Per-chat rate limiters that have been idle for a while
+        for chat_id, limiter in list(self._chat_limiters.items()):
+            if now - limiter.idle_since() >= 60:
+                del self._chat_limiters[chat_id]
+        
+        # Responses too old to be served even as a fallback
+        for key, (response, fetched_at) in list(self._response_cache.items()):
+            if now - fetched_at >= self.stale_cache_ttl:
+                del self._response_cache[key]
+        
+        # Member status cache
+        for key, (status, expires_at) in list(self._admin_cache.items()):
+            if now >= expires_at:
+                del self._admin_cache[key]
+        
+        # Expired logins
+        self.user_sessions.evict_expired()
 
     # ==================== SETUP ====================
 
@@ -1606,7 +2348,26 @@ _Tap a button below to get started!_
             # Build application - this may fail on older python-telegram-bot versions (<22.0)
             # due to internal Updater attribute issues
             try:
-                self.application = Application.builder().token(self.token).build()
+                # Long polls of up to 50s (see start_polling) return as soon as updates arrive,
+                # so one getUpdates round trip picks up every update queued meanwhile
+                builder = (
+                    Application.builder()
+                    .token(self.token)
+                    # Multiplex Bot API calls over one kept-alive connection when h2 is
+                    # installed; the long-poll getUpdates client keeps its own HTTP/1.1 connection
+                    .request(OrjsonRequest(
+                        connection_pool_size=256,
+                        pool_timeout=10,  # wait out bursts instead of failing sends after PTB's default 1s
+                        http_version="2" if HAS_HTTP2 else "1.1",
+                    ))
+                    .get_updates_request(OrjsonRequest(
+                        connection_pool_size=1,
+                        read_timeout=10,  # on top of the long-poll timeout
+                        pool_timeout=10,
+                    ))
+                    .concurrent_updates(256)  # Handle updates from different users in parallel
+                )
+                self.application = builder.build()
             except AttributeError as e:
                 if '_Updater__polling_cleanup_cb' in str(e):
                     error_msg = (
@@ -1622,17 +2383,22 @@ _Tap a button below to get started!_
                     raise
             
             # Login conversation
+            # Abandoned flows: drop what they stashed in user_data (entered email, etc.)
+            on_timeout = [TypeHandler(Update, self.conversation_timed_out)]
+            
             login_conv = ConversationHandler(
                 entry_points=[
                     CommandHandler('login', self.login_command),
                     CallbackQueryHandler(self.button_handler, pattern='^start_login$')
                 ],
                 states={
-                    AWAITING_EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.receive_email)],
-                    AWAITING_PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.receive_password)],
+                    AWAITING_EMAIL: [MessageHandler(_TEXT_NOT_CMD, self.receive_email)],
+                    AWAITING_PASSWORD: [MessageHandler(_TEXT_NOT_CMD, self.receive_password)],
+                    ConversationHandler.TIMEOUT: on_timeout,
                 },
                 fallbacks=[CommandHandler('cancel', self.cancel)],
                 per_message=False,
+                conversation_timeout=self.conversation_timeout,
             )
             
             # Register conversation
@@ -1642,12 +2408,14 @@ _Tap a button below to get started!_
                     CallbackQueryHandler(self.button_handler, pattern='^start_register$')
                 ],
                 states={
-                    AWAITING_REG_USERNAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.receive_reg_username)],
-                    AWAITING_REG_EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.receive_reg_email)],
-                    AWAITING_REG_PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.receive_reg_password)],
+                    AWAITING_REG_USERNAME: [MessageHandler(_TEXT_NOT_CMD, self.receive_reg_username)],
+                    AWAITING_REG_EMAIL: [MessageHandler(_TEXT_NOT_CMD, self.receive_reg_email)],
+                    AWAITING_REG_PASSWORD: [MessageHandler(_TEXT_NOT_CMD, self.receive_reg_password)],
+                    ConversationHandler.TIMEOUT: on_timeout,
                 },
                 fallbacks=[CommandHandler('cancel', self.cancel)],
                 per_message=False,
+                conversation_timeout=self.conversation_timeout,
             )
             
             # Support conversation
@@ -1657,10 +2425,12 @@ _Tap a button below to get started!_
                     CallbackQueryHandler(self.receive_support_category, pattern='^support_')
                 ],
                 states={
-                    AWAITING_SUPPORT_MESSAGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.receive_support_message)],
+                    AWAITING_SUPPORT_MESSAGE: [MessageHandler(_TEXT_NOT_CMD, self.receive_support_message)],
+                    ConversationHandler.TIMEOUT: on_timeout,
                 },
                 fallbacks=[CommandHandler('cancel', self.cancel)],
                 per_message=False,
+                conversation_timeout=self.conversation_timeout,
             )
             
             # Add conversation handlers first
@@ -1668,35 +2438,30 @@ _Tap a button below to get started!_
             self.application.add_handler(register_conv)
             self.application.add_handler(support_conv)
             
-            # Commands
-            self.application.add_handler(CommandHandler("start", self.start))
-            self.application.add_handler(CommandHandler("help", self.start))
-            self.application.add_handler(CommandHandler("balance", self.balance_command))
-            self.application.add_handler(CommandHandler("stats", self.stats_command))
-            self.application.add_handler(CommandHandler("referral", self.referral_command))
-            self.application.add_handler(CommandHandler("leaderboard", self.leaderboard_command))
-            self.application.add_handler(CommandHandler("offerwalls", self.offerwalls_command))
-            self.application.add_handler(CommandHandler("walls", self.offerwalls_command))  # Alias
-            self.application.add_handler(CommandHandler("tasks", self.tasks_command))
-            self.application.add_handler(CommandHandler("surveys", self.surveys_command))
-            self.application.add_handler(CommandHandler("earn", self.offerwalls_command))  # Alias
-            self.application.add_handler(CommandHandler("faq", self.faq_command))
-            self.application.add_handler(CommandHandler("rules", self.rules_command))
-            self.application.add_handler(CommandHandler("unban", self.unban_command))
-            self.application.add_handler(CommandHandler("sync", self.sync_command))
+            # Commands (stateless, so they needn't hold up the update's dispatch)
+            self.application.add_handler(MessageHandler(
+                filters.COMMAND, self.dispatch_command, block=False
+            ))
             
             # Callback handler
             self.application.add_handler(CallbackQueryHandler(self.button_handler))
             
+            # Member status changes (keeps the admin cache fresh)
+            self.application.add_handler(ChatMemberHandler(
+                self.handle_chat_member_update,
+                ChatMemberHandler.CHAT_MEMBER
+            ))
+            
             # New members
             self.application.add_handler(MessageHandler(
                 filters.StatusUpdate.NEW_CHAT_MEMBERS, 
                 self.handle_new_member
             ))
             
-            # All other messages
+            # All other messages: only group text is handled here (private text outside
+            # a conversation has nothing to do), so let the filter drop the rest up front
             self.application.add_handler(MessageHandler(
-                filters.TEXT & ~filters.COMMAND,
+                _TEXT_NOT_CMD & filters.ChatType.GROUPS,
                 self.handle_message
             ))
             
@@ -1710,26 +2475,38 @@ _Tap a button below to get started!_
                     logger.warning("⚠️ Conflict with another instance - this will resolve automatically")
                     return
                 
-                # Log other errors
-                logger.error(f"Exception while handling an update: {error}")
+                # Log other errors with their traceback
+                logger.error("Exception while handling an update: %s", error, exc_info=error)
             
             self.application.add_error_handler(error_handler)
             
             # Scheduled jobs (requires job-queue extension)
             job_queue = self.application.job_queue
             if job_queue:
-                job_queue.run_repeating(self.scheduled_post_job, interval=60, first=10)  # Check every minute
-                job_queue.run_repeating(self.sync_settings_job, interval=60, first=5)  # Sync every 1 minute
+                job_queue.run_once(self.periodic_tick, 10, name='periodic_tick')  # Posts + settings sync, re-arms itself
+                job_queue.run_repeating(self._flush_events, interval=3, first=3)  # Send queued events
+                job_queue.run_repeating(self._gc, interval=300, first=300)  # Evict stale user state
                 logger.info("✅ Job queue configured!")
             else:
                 logger.warning("⚠️ Job queue not available. Install with: pip install 'python-telegram-bot[job-queue]'")
             
             # Register commands with Telegram using post_init
             async def post_init(application):
+                # Open the backend client up front (the first user action doesn't pay for it)
+                await self._ensure_session()
+                await self.restore_sessions()
+                # initialize() has already fetched getMe, so no extra round trip here
+                self.bot_username = application.bot.username.lower()
+                self.bot_mention = f'@{self.bot_username}'
                 await self.register_commands()
                 await self.fetch_mod_settings()  # Sync settings on startup
             
+            # Release pooled backend connections on shutdown
+            async def post_shutdown(application):
+                await self.close()
+            
             self.application.post_init = post_init
+            self.application.post_shutdown = post_shutdown
             
             logger.info("✅ Bot handlers configured!")
             return True
@@ -1738,26 +2515,33 @@ _Tap a button below to get started!_
             logger.error(f"Setup failed: {e}")
             return False
 
+    # (command, handler method or None for conversation commands, / menu description or None for aliases)
+    _COMMANDS = (
+        ("start", "start", "Main menu & help"),
+        ("help", "start", None),
+        ("login", None, "Login to your account"),
+        ("register", None, "Create a new account"),
+        ("logout", "logout_command", "Log out of your account"),
+        ("balance", "balance_command", "Check your balance"),
+        ("stats", "stats_command", "View your statistics"),
+        ("offerwalls", "offerwalls_command", "Browse all offerwalls"),
+        ("walls", "offerwalls_command", None),
+        ("earn", "offerwalls_command", None),
+        ("surveys", "surveys_command", "View available surveys"),
+        ("tasks", "tasks_command", "View available tasks"),
+        ("referral", "referral_command", "Get your referral link"),
+        ("leaderboard", "leaderboard_command", "View top earners"),
+        ("support", None, "Get help & support"),
+        ("faq", "faq_command", "Frequently asked questions"),
+        ("rules", "rules_command", "View group rules"),
+        ("unban", "unban_command", "Unban a user (admin)"),
+        ("sync", "sync_command", "Sync settings (admin)"),
+        ("cancel", None, "Cancel current action"),
+    )
+
     async def register_commands(self):
         """Register bot commands with Telegram so they show in the / menu"""
-        commands = [
-            BotCommand("start", "Main menu & help"),
-            BotCommand("login", "Login to your account"),
-            BotCommand("register", "Create a new account"),
-            BotCommand("balance", "Check your balance"),
-            BotCommand("stats", "View your statistics"),
-            BotCommand("offerwalls", "Browse all offerwalls"),
-            BotCommand("surveys", "View available surveys"),
-            BotCommand("tasks", "View available tasks"),
-            BotCommand("referral", "Get your referral link"),
-            BotCommand("leaderboard", "View top earners"),
-            BotCommand("support", "Get help & support"),
-            BotCommand("faq", "Frequently asked questions"),
-            BotCommand("rules", "View group rules"),
-            BotCommand("unban", "Unban a user (admin)"),
-            BotCommand("sync", "Sync settings (admin)"),
-            BotCommand("cancel", "Cancel current action"),
-        ]
+        commands = [BotCommand(name, description) for name, _, description in self._COMMANDS if description]
         
         try:
             await self.application.bot.set_my_commands(commands)
@@ -1765,39 +2549,24 @@ _Tap a button below to get started!_
         except Exception as e:
             logger.error(f"Failed to register commands: {e}")
 
-    async def clear_webhook_and_updates(self):
-        """Clear webhook and pending updates before starting"""
-        import httpx
-        try:
-            async with httpx.AsyncClient() as client:
-                # Delete webhook and drop pending updates
-                url = f"https://api.telegram.org/bot{self.token}/deleteWebhook?drop_pending_updates=true"
-                response = await client.post(url)
-                if response.status_code == 200:
-                    logger.info("✅ Webhook cleared, pending updates dropped")
-                else:
-                    logger.warning(f"⚠️ Failed to clear webhook: {response.text}")
-        except Exception as e:
-            logger.error(f"Error clearing webhook: {e}")
-
     def run(self):
         """Run the bot"""
-        import time
-        
-        # Wait for old instance to fully stop
-        logger.info("⏳ Waiting 5 seconds for old instance to stop...")
-        time.sleep(5)
-        
-        if not self.setup_handlers():
+        if self.application is None and not self.setup_handlers():
             return
         
         logger.info("🤖 Starting EarnQuest Bot...")
         
         # Use async method directly to avoid run_polling() internal attribute issues
         try:
-            asyncio.run(self._run_async())
+            if HAS_UVLOOP:
+                import uvloop
+                uvloop.run(self._run_async())
+            else:
+                asyncio.run(self._run_async())
         except KeyboardInterrupt:
             logger.info("🛑 Bot stopped by user")
+        except Conflict:
+            raise  # Retried by the startup loop with the same Application
         except Exception as e:
             logger.error(f"Setup failed: {e}")
     
@@ -1806,13 +2575,30 @@ _Tap a button below to get started!_
         try:
             # Initialize and start the application
             await self.application.initialize()
+            # post_init/post_shutdown are only invoked by run_polling(), so call them here
+            if self.application.post_init:
+                await self.application.post_init(self.application)
             await self.application.start()
             
-            # Start polling - v22.5 should handle this correctly
-            await self.application.updater.start_polling(
-                allowed_updates=Update.ALL_TYPES,
-                drop_pending_updates=True
-            )
+            if self.use_webhook:
+                # Telegram pushes updates to us; no idle getUpdates traffic
+                await self.application.updater.start_webhook(
+                    listen="0.0.0.0",
+                    port=self.port,
+                    url_path=self.token,
+                    webhook_url=f"{self.public_url.rstrip('/')}/{self.token}",
+                    allowed_updates=ALLOWED_UPDATES,
+                    drop_pending_updates=True
+                )
+            else:
+                # Start polling - v22.5 should handle this correctly
+                await self.application.updater.start_polling(
+                    poll_interval=0.0,
+                    timeout=50,
+                    bootstrap_retries=-1,  # Keep retrying startup network errors
+                    allowed_updates=ALLOWED_UPDATES,
+                    drop_pending_updates=True
+                )
             
             logger.info("✅ Bot is now running and listening for messages...")
             
@@ -1824,10 +2610,12 @@ _Tap a button below to get started!_
                 logger.info("🛑 Received shutdown signal")
             finally:
                 # Shutdown gracefully
-                if updater.running:
-                    await updater.stop()
+                if self.application.updater.running:
+                    await self.application.updater.stop()
                 await self.application.stop()
                 await self.application.shutdown()
+                if self.application.post_shutdown:
+                    await self.application.post_shutdown(self.application)
                 logger.info("✅ Bot shut down gracefully")
         except Exception as e:
             logger.error(f"Error running bot: {e}")
@@ -1835,43 +2623,64 @@ _Tap a button below to get started!_
 
 
 if __name__ == "__main__":
-    import time
     import sys
     
-    # Add startup delay to prevent conflicts during deployment
-    startup_delay = int(os.environ.get('BOT_STARTUP_DELAY', '5'))
+    _init_runtime()
+    
+    # Optional fixed delay; by default we probe for a running instance instead (below)
+    startup_delay = int(os.environ.get('BOT_STARTUP_DELAY', '0'))
     if startup_delay > 0:
         logger.info(f"⏳ Startup delay: {startup_delay} seconds...")
         time.sleep(startup_delay)
     
-    # Clear any existing sessions via API
-    token = os.environ.get('TELEGRAM_BOT_TOKEN')
-    if token:
-        try:
-            import requests
-            # Force delete webhook and drop pending updates
-            url = f"https://api.telegram.org/bot{token}/deleteWebhook?drop_pending_updates=true"
-            response = requests.post(url, timeout=10)
-            logger.info(f"🔄 Webhook cleanup: {response.json()}")
-            
-            # Small delay after cleanup
-            time.sleep(2)
-        except Exception as e:
-            logger.warning(f"Webhook cleanup failed: {e}")
+    # One pooled client for startup calls to the Bot API; failed connects are
+    # retried on the transport
+    _SESSION = httpx.Client(
+        base_url="https://api.telegram.org",
+        timeout=10,
+        transport=httpx.HTTPTransport(retries=3),
+    )
     
-    bot = EarnQuestBot()
-    
-    # Retry logic for conflict errors
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            bot.run()
-            break
-        except Exception as e:
-            if "Conflict" in str(e) and attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 10
-                logger.warning(f"⚠️ Conflict detected, waiting {wait_time}s before retry...")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"❌ Bot failed: {e}")
-                sys.exit(1)
+    try:
+        # Clear any existing sessions via API
+        token = os.environ.get('TELEGRAM_BOT_TOKEN')
+        if token:
+            try:
+                # Force delete webhook and drop pending updates (on the pooled startup client, and
+                # before the probe below, which Telegram answers with 409 while a webhook is set)
+                response = _SESSION.post(f"/bot{token}/deleteWebhook", params={'drop_pending_updates': 'true'})
+                logger.info(f"🔄 Webhook cleanup: {orjson.loads(response.content)}")
+                
+                # Start right away unless a previous instance is still polling (409 Conflict);
+                # then back off with decorrelated jitter
+                probe_url = f"/bot{token}/getUpdates"
+                delays = backoff_delays(cap=30)
+                for attempt in range(6):
+                    response = _SESSION.post(probe_url, json={'timeout': 0, 'limit': 1})
+                    if response.status_code != 409:
+                        break
+                    wait_time = next(delays)
+                    logger.warning(f"⚠️ Another instance is still polling, retrying in {wait_time:.1f}s...")
+                    time.sleep(wait_time)
+            except Exception as e:
+                logger.warning(f"Webhook cleanup failed: {e}")
+        
+        bot = EarnQuestBot()
+        
+        # Retry logic for conflict errors
+        max_retries = 3
+        delays = backoff_delays()
+        for attempt in range(max_retries):
+            try:
+                bot.run()
+                break
+            except Exception as e:
+                if "Conflict" in str(e) and attempt < max_retries - 1:
+                    wait_time = next(delays)
+                    logger.warning(f"⚠️ Conflict detected, waiting {wait_time:.1f}s before retry...")
+                    time.sleep(wait_time)
+                else:
+                    logger.error(f"❌ Bot failed: {e}")
+                    sys.exit(1)
+    finally:
+        _SESSION.close()